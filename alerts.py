@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Reminder points, in days before expiry, for users who have not picked their own
+DEFAULT_ALERT_THRESHOLDS = (7, 3, 1, 0)
+
+# Largest threshold a user can choose; bounds the expiry range the job scans
+MAX_ALERT_THRESHOLD_DAYS = 14
+
+ALERT_THRESHOLD_CHOICES = (14, 7, 5, 3, 2, 1, 0)
+
+MS_PER_DAY = 24 * 60 * 60 * 1000
+
+
+def normalize_thresholds(values: Optional[Iterable[int]]) -> Tuple[int, ...]:
+    """Clamp, dedupe and sort a user's thresholds, falling back to the defaults"""
+    thresholds = sorted({int(v) for v in values or () if 0 <= int(v) <= MAX_ALERT_THRESHOLD_DAYS})
+    return tuple(thresholds) if thresholds else tuple(sorted(DEFAULT_ALERT_THRESHOLDS))
+
+
+def alert_threshold(days_left: int, thresholds: Iterable[int]) -> Optional[int]:
+    """Smallest threshold the product has reached, or None if it is not due (or already expired)"""
+    if days_left < 0:
+        return None
+    reached = [t for t in thresholds if t >= days_left]
+    return min(reached) if reached else None
+
+
+def threshold_label(threshold: int) -> str:
+    if threshold == 0:
+        return "Expires today"
+    return f"Expires within {threshold} day(s)"
+
+
+def due_alerts_pipeline(now: datetime, ledger_collection: str, users_collection: str = "users") -> List[Dict[str, Any]]:
+    """
+    Aggregation that assigns every due product its alert threshold in one pass
+
+    A single range scan on the expiry index covers the widest possible window.
+    Each product picks up its owner's thresholds, gets days_left and the
+    smallest threshold it has reached, and is dropped if the ledger already
+    has that (product, threshold, expiry) entry. The expiry is part of the key
+    so a product whose date is edited or postponed is reminded again. Adding
+    thresholds does not add queries.
+    """
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        {"$match": {
+            "expiry": {"$gte": today, "$lt": today + timedelta(days=MAX_ALERT_THRESHOLD_DAYS + 1)},
+            "is_deleted": {"$ne": True}
+        }},
+        {"$lookup": {
+            "from": users_collection,
+            "localField": "user_email",
+            "foreignField": "email",
+            "pipeline": [{"$project": {"_id": 0, "alert_thresholds": 1}}],
+            "as": "owner"
+        }},
+        {"$addFields": {
+            "days_left": {"$floor": {"$divide": [{"$subtract": ["$expiry", today]}, MS_PER_DAY]}},
+            "thresholds": {"$ifNull": [{"$arrayElemAt": ["$owner.alert_thresholds", 0]},
+                                       list(DEFAULT_ALERT_THRESHOLDS)]}
+        }},
+        {"$addFields": {
+            "threshold": {"$min": {"$filter": {
+                "input": "$thresholds",
+                "cond": {"$gte": ["$$this", "$days_left"]}
+            }}}
+        }},
+        {"$match": {"threshold": {"$ne": None}}},
+        {"$lookup": {
+            "from": ledger_collection,
+            "localField": "_id",
+            "foreignField": "product_id",
+            "let": {"threshold": "$threshold", "expiry": "$expiry"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [{"$eq": ["$threshold", "$$threshold"]},
+                                               {"$eq": ["$expiry", "$$expiry"]}]}}},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "sent"
+        }},
+        {"$match": {"sent": {"$size": 0}}},
+        {"$project": {"name": 1, "expiry": 1, "user_email": 1, "days_left": 1, "threshold": 1}},
+        {"$sort": {"user_email": 1, "expiry": 1}}
+    ]
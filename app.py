@@ -1,17 +1,22 @@
 import streamlit as st
 from datetime import datetime
-from PIL import Image
-import dateparser
 import random
-import pandas as pd
-import plotly.express as px
 from scheduler import start_scheduler
-from ocr import extract_expiry_date
-from utils import get_expiry_status
+from ocr_async import submit_expiry_date_extraction
+from ocr_throttle import is_throttled
+from utils import classify_expiry, calendar_days_left
+from dates import DATE_DAY_FIRST, parse_date_candidates
+from alerts import ALERT_THRESHOLD_CHOICES, alert_threshold, normalize_thresholds, threshold_label
+from exports import EXPORT_FORMATS, export_rows
+from products import (FILTER_OPTIONS, PRODUCT_SORT, build_product_query, build_undated_query, fetch_product_page,
+                      annotate_expiry)
+from products import (BULK_COLUMNS, parse_pasted_products, read_product_import, validate_bulk_products,
+                      build_product_documents, insert_products, set_products_deleted, purge_products)
+from live_updates import LIVE_REFRESH_SECONDS, ProductStore
+from db import get_db
 import re
 from bson.objectid import ObjectId
 import copy
-from io import BytesIO
 
 # ============ THEME INIT ============ #
 if "theme" not in st.session_state:
@@ -125,6 +130,44 @@ h1 {
 theme_css = dark_styles if st.session_state["theme"] == "dark" else light_styles
 st.markdown(f"<style>{theme_css + common_styles}</style>", unsafe_allow_html=True)
 
+# ============ DATABASE ============ #
+# The pooled client is created on the first rerun, not at import, and reused by every session
+@st.cache_resource
+def get_database():
+    return get_db()
+
+db = get_database()
+collection = db["products"]
+
+# ============ PRODUCT SNAPSHOT ============ #
+# One live cache per process, shared by every session and kept current by a change stream
+@st.cache_resource
+def get_product_store():
+    store = ProductStore(collection)
+    store.start()
+    return store
+
+product_store = get_product_store()
+
+def load_products(user_email, deleted=False):
+    """Return the user's active (or deleted) products from the live cache"""
+    return product_store.products(user_email, deleted)
+
+def load_expiry_summary(user_email):
+    """
+    The user's active products and their classify_expiry summary, as one pair
+
+    Both come from the same version of the cache, so the summary's arrays line
+    up with the products even if a change event lands in between reads. The
+    summary is recomputed only when the products (or the date) change.
+    """
+    return product_store.derived(user_email, ("expiry_summary", datetime.now().date()),
+                                 lambda products: (products, classify_expiry(products)))
+
+def invalidate_products(*product_ids):
+    """Apply this session's writes to the cache now rather than when their change events arrive"""
+    product_store.refresh_products(st.session_state["user_email"], product_ids)
+
 # ============ SIDEBAR ============ #
 with st.sidebar:
     email_display = st.session_state.get("user_email", "Guest") or "Guest"
@@ -137,15 +180,12 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
     if email_display != "Guest":
-        user_products = list(collection.find({"user_email": email_display, "is_deleted": {"$ne": True}}))
-        now = datetime.now()
-        expired = sum(get_expiry_status(p["expiry"]) == "Expired" for p in user_products)
-        expiring = sum(get_expiry_status(p["expiry"]) == "Expiring Soon" for p in user_products)
-        fresh = sum(get_expiry_status(p["expiry"]) == "Fresh" for p in user_products)
+        _, sidebar_summary = load_expiry_summary(email_display)
+        sidebar_counts = sidebar_summary["counts"]
         st.markdown(f"""
-        <div class='sidebar-content'>❗ Expired Items: <b>{expired}</b></div>
-        <div class='sidebar-content'>⚡ Expiring Soon: <b>{expiring}</b></div>
-        <div class='sidebar-content'>🌱 Fresh Items: <b>{fresh}</b></div>
+        <div class='sidebar-content'>❗ Expired Items: <b>{sidebar_counts["Expired"]}</b></div>
+        <div class='sidebar-content'>⚡ Expiring Soon: <b>{sidebar_counts["Expiring Soon"]}</b></div>
+        <div class='sidebar-content'>🌱 Fresh Items: <b>{sidebar_counts["Fresh"]}</b></div>
         """, unsafe_allow_html=True)
 
     theme_choice = st.radio("🌙☀ Theme:", ["dark", "light"], index=0 if st.session_state["theme"] == "dark" else 1)
@@ -249,13 +289,24 @@ if "scheduler_started" not in st.session_state:
     st.session_state["scheduler_started"] = True
     st.success("✅ Notification scheduler started.")
 
-# ============ METRICS ============ #
+# ============ LIVE REFRESH ============ #
 user_email = st.session_state["user_email"]
-all_products = list(collection.find({"user_email": user_email, "is_deleted": {"$ne": True}}))
-now = datetime.now()
-expired_count = sum(get_expiry_status(p["expiry"]) == "Expired" for p in all_products)
-soon_count = sum(get_expiry_status(p["expiry"]) == "Expiring Soon" for p in all_products)
-fresh_count = sum(get_expiry_status(p["expiry"]) == "Fresh" for p in all_products)
+rendered_version = product_store.version(user_email)
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def refresh_on_change():
+    # Redraw the page when another session, device or job changes this user's products
+    if product_store.version(user_email) != rendered_version:
+        st.rerun()
+
+refresh_on_change()
+
+# ============ METRICS ============ #
+# One read, so the summary's arrays stay aligned with all_products (the Alerts tab zips them)
+all_products, expiry_summary = load_expiry_summary(user_email)
+expired_count = expiry_summary["counts"]["Expired"]
+soon_count = expiry_summary["counts"]["Expiring Soon"]
+fresh_count = expiry_summary["counts"]["Fresh"]
 
 c1, c2, c3 = st.columns(3)
 c1.metric("⏳ Expired Items", expired_count)
@@ -290,74 +341,44 @@ tab_products, tab_add, tab_insights, tab_alerts, tab_recycle_bin = st.tabs(
 with tab_products:
     st.markdown("<h2>📋 Products List</h2>", unsafe_allow_html=True)
     search_term = st.text_input("🔍 Search by Product Name").strip().lower()
-    filter_option = st.selectbox("📂 Filter by:", ["All Items", "Expiring This Week", "Expired Only"])
+    filter_option = st.selectbox("📂 Filter by:", FILTER_OPTIONS)
+    page_size = st.selectbox("📄 Items per page:", [10, 25, 50, 100], index=1)
     show_products = st.checkbox("👀 Show Products List?", value=True)
 
     if show_products:
-        products = []
-        for p in collection.find({"user_email": user_email, "is_deleted": {"$ne": True}}):
-            expiry = p["expiry"]
-            if isinstance(expiry, str):
-                expiry = dateparser.parse(expiry)
-            p["expiry_dt"] = expiry
-            p["days_left"] = (expiry - now).days
-            products.append(p)
-
-        if filter_option == "Expiring This Week":
-            products = [p for p in products if 0 <= p["days_left"] <= 7]
-        elif filter_option == "Expired Only":
-            products = [p for p in products if p["days_left"] < 0]
-
-        if search_term:
-            products = [p for p in products if search_term in p["name"].lower()]
+        # Filtering, search and paging run in Mongo; only the current page is loaded
+        product_query = build_product_query(user_email, filter_option, search_term)
+        page_signature = (user_email, filter_option, search_term, page_size)
+        page_state = st.session_state.setdefault("product_pages", {"signature": None, "cursors": [None]})
+        if page_state["signature"] != page_signature:
+            page_state.update(signature=page_signature, cursors=[None])
+        page_items, next_cursor = fetch_product_page(collection, product_query, page_size,
+                                                     page_state["cursors"][-1])
+        products = annotate_expiry(page_items)
 
         if products:
-            export_df = pd.DataFrame([{
-                "Name": p["name"],
-                "Expiry Date": p["expiry_dt"].strftime("%Y-%m-%d"),
-                "Days Left": p["days_left"],
-                "Status": get_expiry_status(p["expiry_dt"])
-            } for p in products])
-
-            # CSV Export
-            st.download_button("💾 Export as CSV",
-                               data=export_df.to_csv(index=False).encode("utf-8"),
-                               file_name="grocery_products.csv",
-                               mime="text/csv")
-
-            # Excel Export
-            excel_buffer = BytesIO()
-            export_df.to_excel(excel_buffer, index=False)
-            excel_buffer.seek(0)
-            st.download_button("📊 Export as Excel",
-                               data=excel_buffer,
-                               file_name="grocery_products.xlsx",
-                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-            # PDF Export
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            pdf.cell(200, 10, txt="Grocery Product List", ln=True, align='C')
-            pdf.ln(10)
-            for _, row in export_df.iterrows():
-                line = f"{row['Name']} | {row['Expiry Date']} | {row['Days Left']} days | {row['Status']}"
-                pdf.multi_cell(0, 10, txt=line)
-
-            pdf_buffer = BytesIO()
-            pdf_output = pdf.output(dest='S').encode('latin-1')
-            pdf_buffer.write(pdf_output)
-            pdf_buffer.seek(0)
-            st.download_button("📄 Export as PDF",
-                               data=pdf_buffer,
-                               file_name="grocery_products.pdf",
-                               mime="application/pdf")
+            # Exports cover every filtered product, are only rendered on request
+            # and are kept until the product set changes
+            rows_key = (page_signature[:3], datetime.now().date(), rendered_version)
+            export_cache = st.session_state.setdefault("export_cache", {})
+            export_data = None
+            for col, (fmt, (builder, file_name, mime, label)) in zip(st.columns(len(EXPORT_FORMATS)),
+                                                                     EXPORT_FORMATS.items()):
+                with col:
+                    cached = export_cache.get(fmt)
+                    if (cached is None or cached[0] != rows_key) and st.button(f"📦 Prepare {fmt}", key=f"prepare_{fmt}"):
+                        if export_data is None:
+                            export_data = export_rows(annotate_expiry(
+                                list(collection.find(product_query).sort(PRODUCT_SORT))))
+                        cached = export_cache[fmt] = (rows_key, builder(export_data))
+                    if cached is not None and cached[0] == rows_key:
+                        st.download_button(label, data=cached[1], file_name=file_name, mime=mime)
 
             # Display products
-            for p in sorted(products, key=lambda x: x["expiry_dt"]):
+            for p in products:
                 days = p["days_left"]
                 exp = p["expiry_dt"].strftime("%Y-%m-%d")
-                status = get_expiry_status(p["expiry_dt"])
+                status = p["status"]
                 emoji = "❌" if status == "Expired" else ("⚠" if status == "Expiring Soon" else "✅")
                 pid = str(p["_id"])
 
@@ -378,24 +399,74 @@ with tab_products:
                                                       "expiry": datetime(new_expiry.year, new_expiry.month,
                                                                          new_expiry.day)
                                                   }})
+                            invalidate_products(p["_id"])
                             st.success(f"✅ Updated {new_name}")
                             st.rerun()
                 with col_del:
                     if st.button("🗑️", key=f"delete_{pid}"):
                         st.session_state["last_deleted_item"] = copy.deepcopy(p)
                         collection.update_one({"_id": p["_id"]}, {"$set": {"is_deleted": True}})
+                        invalidate_products(p["_id"])
                         st.warning(f"🗑 Deleted {p['name']}.")
 
+            # Bulk delete: every selected product on this page in one update_many
+            page_by_id = {str(p["_id"]): p for p in products}
+            selected_ids = st.multiselect(
+                "🗑 Select products to delete:", list(page_by_id),
+                format_func=lambda pid: f"{page_by_id[pid]['name']} ({page_by_id[pid]['expiry_dt'].strftime('%Y-%m-%d')})")
+            if selected_ids and st.button(f"🗑 Delete {len(selected_ids)} Selected", key="bulk_delete"):
+                product_ids = [page_by_id[pid]["_id"] for pid in selected_ids]
+                set_products_deleted(collection, user_email, product_ids)
+                invalidate_products(*product_ids)
+                st.warning(f"🗑 Deleted {len(product_ids)} product(s). Restore them from the Recycle Bin.")
+
             # Undo
             if st.session_state["last_deleted_item"]:
                 undo = st.session_state["last_deleted_item"]
                 if st.button(f"↩️ Undo Delete for {undo['name']}", key=f"undo_{str(undo['_id'])}"):
                     collection.update_one({"_id": undo['_id']}, {"$set": {"is_deleted": False}})
+                    invalidate_products(undo['_id'])
                     st.success(f"✅ Restored {undo['name']}")
                     st.session_state["last_deleted_item"] = None
                     st.rerun()
+
+            # Pagination
+            col_prev, col_page, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if len(page_state["cursors"]) > 1 and st.button("⬅ Previous", key="page_prev"):
+                    page_state["cursors"].pop()
+                    st.rerun()
+            with col_page:
+                st.markdown(f"<div style='text-align:center;'>Page {len(page_state['cursors'])}</div>",
+                            unsafe_allow_html=True)
+            with col_next:
+                if next_cursor and st.button("Next ➡", key="page_next"):
+                    page_state["cursors"].append(next_cursor)
+                    st.rerun()
         else:
             st.warning("😔 No products match your criteria.")
+
+        # Products without a date expiry are left out of the date-ordered pages; list them so they can be fixed
+        if filter_option == "All Items":
+            undated = list(collection.find(build_undated_query(user_email, search_term)).sort("_id", 1).limit(100))
+            if undated:
+                with st.expander(f"❔ {len(undated)} product(s) without a readable expiry date"):
+                    for p in undated:
+                        pid = str(p["_id"])
+                        col_item, col_date, col_save = st.columns([3, 2, 1])
+                        with col_item:
+                            st.markdown(f"❔ <b>{p['name']}</b> — stored expiry: {p.get('expiry')!r}",
+                                        unsafe_allow_html=True)
+                        with col_date:
+                            fixed_expiry = st.date_input(f"Expiry for {p['name']}:", value=None,
+                                                         key=f"fix_expiry_{pid}", label_visibility="collapsed")
+                        with col_save:
+                            if fixed_expiry and st.button("✅ Save", key=f"fix_save_{pid}"):
+                                collection.update_one({"_id": p["_id"]}, {"$set": {
+                                    "expiry": datetime(fixed_expiry.year, fixed_expiry.month, fixed_expiry.day)}})
+                                invalidate_products(p["_id"])
+                                st.success(f"✅ Updated {p['name']}")
+                                st.rerun()
 # ============ ADD ITEM TAB ============ #
 with tab_add:
     st.markdown("<h2>➕ Add Item Manually</h2>", unsafe_allow_html=True)
@@ -405,39 +476,185 @@ with tab_add:
         submitted = st.form_submit_button("✅ Add Product")
         if submitted and name:
             expiry_dt = datetime(expiry_date.year, expiry_date.month, expiry_date.day)
-            collection.insert_one({
+            result = collection.insert_one({
                 "user_email": user_email,
                 "name": name,
                 "expiry": expiry_dt,
                 "is_deleted": False
             })
+            invalidate_products(result.inserted_id)
             st.success(f"✅ Added {name}, expiring on {expiry_dt.strftime('%Y-%m-%d')}.")
 
-    st.markdown("<h2>📷 Add Item via Image (OCR Detection)</h2>", unsafe_allow_html=True)
-    uploaded_image = st.file_uploader("Upload an image of the label (JPG, PNG):", type=["jpg", "jpeg", "png"])
-    if uploaded_image:
-        image = Image.open(uploaded_image)
-        st.image(image, caption="Uploaded Image", use_column_width=True)
+    def add_bulk_products(rows, key):
+        """Validate bulk-entry rows and insert the valid ones with one insert_many"""
+        valid, errors = validate_bulk_products(rows)
+        if errors:
+            shown = "\n".join(f"- {error}" for error in errors[:20])
+            more = f"\n- ...and {len(errors) - 20} more" if len(errors) > 20 else ""
+            st.warning(f"⚠ {len(errors)} row(s) will be skipped:\n\n{shown}{more}")
+        if valid.empty:
+            return
+        # Remember what was added so a rerun with the same rows cannot insert them twice
+        signature = (key, tuple(valid["name"]), tuple(valid["expiry"]))
+        added = st.session_state.setdefault("bulk_added", set())
+        if signature in added:
+            st.success(f"✅ Added {len(valid)} product(s).")
+            return
+        if st.button(f"✅ Add {len(valid)} Product(s)", key=f"{key}_add"):
+            inserted_ids = insert_products(collection, build_product_documents(valid, user_email))
+            invalidate_products(*inserted_ids)
+            added.add(signature)
+            st.success(f"✅ Added {len(inserted_ids)} product(s).")
+
+    def bulk_editor(rows, key):
+        return st.data_editor(rows, key=key, num_rows="dynamic", use_container_width=True, column_config={
+            BULK_COLUMNS[0]: st.column_config.TextColumn(BULK_COLUMNS[0]),
+            BULK_COLUMNS[1]: st.column_config.DateColumn(BULK_COLUMNS[1], format="YYYY-MM-DD"),
+        })
+
+    st.markdown("<h2>📥 Bulk Add Items</h2>", unsafe_allow_html=True)
+    bulk_source = st.radio("Add from:", ["Pasted list", "CSV / Excel import", "Table"], horizontal=True)
+    bulk_rows = None
+    if bulk_source == "Pasted list":
+        pasted = st.text_area("One product per line: name and expiry date, separated by a comma, semicolon or tab",
+                              placeholder="Milk, 2025-07-14\nCheddar cheese; 02/08/2025")
+        if pasted.strip():
+            try:
+                bulk_rows = parse_pasted_products(pasted)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+    elif bulk_source == "CSV / Excel import":
+        import_file = st.file_uploader("Upload a CSV or Excel file laid out like the export (Name, Expiry Date):",
+                                       type=["csv", "xlsx"])
+        if import_file is not None:
+            try:
+                bulk_rows = read_product_import(import_file, import_file.name)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+    else:
+        import pandas as pd
+        bulk_rows = bulk_editor(pd.DataFrame({BULK_COLUMNS[0]: pd.Series(dtype="string"),
+                                              BULK_COLUMNS[1]: pd.Series(dtype="datetime64[ns]")}), "bulk_editor")
+    if bulk_rows is not None and len(bulk_rows):
+        add_bulk_products(bulk_rows, "bulk")
 
-        detected_date = extract_expiry_date(uploaded_image)
+    st.markdown("<h2>📷 Add Item via Image (OCR Detection)</h2>", unsafe_allow_html=True)
+    uploaded_images = st.file_uploader("Upload images of the labels (JPG, PNG):", type=["jpg", "jpeg", "png"],
+                                       accept_multiple_files=True) or []
+    day_first = st.radio("📅 Numeric dates on my labels are written:", ["Day first (31/12/2026)",
+                                                                        "Month first (12/31/2026)"],
+                         index=0 if DATE_DAY_FIRST else 1, horizontal=True, key="ocr_day_first").startswith("Day")
+
+    def ocr_date_readings(detection):
+        """Every reading of the detected expiry date, the user's day/month order first"""
+        if not detection or not detection.best:
+            return ()
+        best = detection.best
+        return parse_date_candidates(best.text, day_first) or (best.date,) + best.alternatives
+
+    def chosen_ocr_date(job_key, detection):
+        readings = ocr_date_readings(detection)
+        chosen = st.session_state.get(f"ocr_date_{job_key}")
+        return chosen if chosen in readings else (readings[0] if readings else None)
+
+    # Labels are analyzed in the background; each result fills in when Azure answers
+    ocr_jobs = st.session_state.setdefault("ocr_jobs", {})
+    upload_keys = [f"{f.name}-{f.size}" for f in uploaded_images]
+    for job_key in list(ocr_jobs):
+        if job_key not in upload_keys:
+            ocr_jobs.pop(job_key).cancel()
+    if uploaded_images:
+        # Pillow is only needed once there is an image to show
+        from PIL import Image
+
+    # Each upload is decoded once per rerun; the preview and OCR preprocessing share it
+    decoded_images = {}
+    for job_key, uploaded_image in zip(upload_keys, uploaded_images):
+        decoded_images[job_key] = Image.open(uploaded_image)
+        if job_key not in ocr_jobs:
+            try:
+                # Fully decoded here, before the OCR thread reads it
+                decoded_images[job_key].load()
+                ocr_jobs[job_key] = submit_expiry_date_extraction(uploaded_image, image=decoded_images[job_key])
+            except RuntimeError as e:
+                st.error(f"❌ {e}")
+                break
+
+    def render_ocr_result(idx, job_key, job, uploaded_image, polling):
+        if not job.done():
+            st.info(f"⏳ Reading the label on {uploaded_image.name}...")
+            return
+        if polling:
+            # Stop polling and refresh the whole page once the result is in
+            st.rerun()
+        try:
+            detection = job.result()
+        except Exception as e:
+            if is_throttled(e):
+                st.warning(f"⏳ The OCR service is busy; remove and re-add {uploaded_image.name} in a minute.")
+            else:
+                st.error(f"❌ OCR failed for {uploaded_image.name}: {e or 'timed out'}")
+            return
+
+        readings = ocr_date_readings(detection)
+        if len(readings) > 1:
+            # 04/05/2026 is 4 May or 5 April: ask rather than silently picking one
+            st.warning(f"⚠ The label date {detection.best.text!r} can be read more than one way.")
+            detected_date = st.radio("Which expiry date is it?", readings, key=f"ocr_date_{job_key}",
+                                     format_func=lambda d: d.strftime("%d %B %Y"), horizontal=True)
+        else:
+            detected_date = readings[0] if readings else None
+            if detected_date:
+                st.success(f"✅ Detected Expiry Date: {detected_date.strftime('%Y-%m-%d')}")
         if detected_date:
-            st.success(f"✅ Detected Expiry Date: {detected_date.strftime('%Y-%m-%d')}")
-            with st.form("ocr_confirm_form"):
+            with st.form(f"ocr_confirm_form_{idx}"):
                 product_name = st.text_input("Product Name (Enter Manually): ")
                 confirm = st.form_submit_button("✅ Add Product from Image")
                 if confirm and product_name:
-                    collection.insert_one({
+                    result = collection.insert_one({
                         "user_email": user_email,
                         "name": product_name,
                         "expiry": detected_date,
                         "is_deleted": False
                     })
+                    invalidate_products(result.inserted_id)
                     st.success(f"✅ Added {product_name}, expiring on {detected_date.strftime('%Y-%m-%d')}.")
         else:
-            st.warning("⚠ No expiry date detected in the image.")
+            st.warning(f"⚠ No expiry date detected in {uploaded_image.name}.")
+
+    for idx, (job_key, uploaded_image) in enumerate(zip(upload_keys, uploaded_images)):
+        if job_key not in ocr_jobs:
+            continue
+        image = decoded_images[job_key]
+        st.image(image, caption=uploaded_image.name, use_column_width=True)
+        job = ocr_jobs[job_key]
+        polling = not job.done()
+        st.fragment(render_ocr_result, run_every=1.0 if polling else None)(idx, job_key, job, uploaded_image,
+                                                                           polling)
+
+    # Labels read so far can be reviewed in one table and added with one write
+    detected = []
+    for job_key, uploaded_image in zip(upload_keys, uploaded_images):
+        job = ocr_jobs.get(job_key)
+        if job is None or not job.done() or job.cancelled() or job.exception() is not None:
+            continue
+        detection = job.result()
+        detected_date = chosen_ocr_date(job_key, detection)
+        if detected_date:
+            detected.append((detection.product_name or uploaded_image.name.rsplit(".", 1)[0], detected_date))
+    if len(detected) > 1:
+        import pandas as pd
+        st.markdown("<h3>📦 Add All Detected Items</h3>", unsafe_allow_html=True)
+        detected_rows = bulk_editor(pd.DataFrame(detected, columns=list(BULK_COLUMNS)),
+                                    f"ocr_bulk_editor_{hash(tuple(upload_keys))}")
+        add_bulk_products(detected_rows, "ocr_bulk")
 
 # ============ INSIGHTS TAB ============ #
 with tab_insights:
+    # Charting libraries are heavy to import; load them after login, not for the login page
+    import pandas as pd
+    import plotly.express as px
+
     st.markdown("<h2>📊 Expiry Insights</h2>", unsafe_allow_html=True)
     status_counts = {"Fresh": fresh_count, "Expiring Soon": soon_count, "Expired": expired_count}
     fig = px.pie(
@@ -468,18 +685,62 @@ with tab_insights:
 # ============ ALERTS TAB ============ #
 with tab_alerts:
     st.markdown("<h2>⚡ Alerts</h2>", unsafe_allow_html=True)
-    soon_products = [p for p in all_products if get_expiry_status(p["expiry"]) == "Expiring Soon"]
-    if soon_products:
-        for p in soon_products:
-            st.warning(f"⚠ {p['name']} expires on {p['expiry'].strftime('%Y-%m-%d')}. Consider using it soon.")
+
+    def load_alert_thresholds(email):
+        """Reminder thresholds stored on the user, read once per session"""
+        if st.session_state.get("alert_thresholds_for") != email:
+            user = db["users"].find_one({"email": email}, {"alert_thresholds": 1}) or {}
+            st.session_state["alert_thresholds"] = normalize_thresholds(user.get("alert_thresholds"))
+            st.session_state["alert_thresholds_for"] = email
+        return st.session_state["alert_thresholds"]
+
+    alert_thresholds = load_alert_thresholds(user_email)
+    with st.expander("🔔 Reminder settings"):
+        chosen_thresholds = st.multiselect("Remind me this many days before expiry:", ALERT_THRESHOLD_CHOICES,
+                                           default=list(alert_thresholds))
+        if st.button("💾 Save reminders"):
+            alert_thresholds = normalize_thresholds(chosen_thresholds)
+            db["users"].update_one({"email": user_email}, {"$set": {"alert_thresholds": list(alert_thresholds)}})
+            st.session_state["alert_thresholds"] = alert_thresholds
+            st.success("✅ Reminder settings saved.")
+
+    # Same buckets as the daily email: the smallest threshold each product has reached
+    alert_buckets = {}
+    for p, expiry, days, status in zip(all_products,
+                                       expiry_summary["expiry"].astype(object),
+                                       calendar_days_left(expiry_summary["expiry"]),
+                                       expiry_summary["status"]):
+        threshold = alert_threshold(int(days), alert_thresholds) if status != "Unknown" else None
+        if threshold is not None:
+            alert_buckets.setdefault(threshold, []).append((expiry, p["name"]))
+
+    if alert_buckets:
+        for threshold in sorted(alert_buckets):
+            st.markdown(f"<h4>{threshold_label(threshold)}</h4>", unsafe_allow_html=True)
+            for expiry, name in sorted(alert_buckets[threshold]):
+                st.warning(f"⚠ {name} expires on {expiry.strftime('%Y-%m-%d')}. Consider using it soon.")
     else:
         st.success("✅ No expiring soon alerts.")
 
 # ============ RECYCLE BIN TAB ============ #
 with tab_recycle_bin:
     st.markdown("<h2>♻ Deleted Items</h2>", unsafe_allow_html=True)
-    deleted_products = list(collection.find({"user_email": user_email, "is_deleted": True}))
+    deleted_products = load_products(user_email, deleted=True)
     if deleted_products:
+        deleted_ids = [p["_id"] for p in deleted_products]
+        col_restore_all, col_empty = st.columns(2)
+        with col_restore_all:
+            if st.button(f"↩️ Restore All ({len(deleted_ids)})", key="recycle_restore_all"):
+                set_products_deleted(collection, user_email, deleted_ids, deleted=False)
+                invalidate_products(*deleted_ids)
+                st.success(f"✅ Restored {len(deleted_ids)} product(s)")
+                st.rerun()
+        with col_empty:
+            if st.button("🧹 Empty Recycle Bin", key="recycle_empty"):
+                purge_products(collection, user_email, deleted_ids)
+                invalidate_products(*deleted_ids)
+                st.warning(f"🗑 Permanently deleted {len(deleted_ids)} product(s).")
+                st.rerun()
         for p in deleted_products:
             pid = str(p["_id"])
             col_item, col_restore, col_delete = st.columns([3, 1, 1])
@@ -488,11 +749,13 @@ with tab_recycle_bin:
             with col_restore:
                 if st.button(f"↩️ Restore", key=f"recycle_restore_{pid}"):
                     collection.update_one({"_id": p['_id']}, {"$set": {"is_deleted": False}})
+                    invalidate_products(p['_id'])
                     st.success(f"✅ Restored {p['name']}")
                     st.rerun()
             with col_delete:
                 if st.button(f"❌ Delete", key=f"recycle_delete_{pid}"):
                     collection.delete_one({"_id": p['_id']})
+                    invalidate_products(p['_id'])
                     st.warning(f"🗑 Permanently deleted {p['name']}.")
                     st.rerun()
     else:
@@ -0,0 +1,89 @@
+"""
+Micro-benchmark: dates.parse_date_string vs the old strptime trial loop vs dateparser
+
+Run from the repository root:
+    python benchmarks/bench_date_parser.py [--number 20000]
+"""
+import os
+import sys
+import argparse
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dates import parse_date_candidates, parse_date_string  # noqa: E402
+
+# Typical strings pulled off labels by the OCR patterns
+SAMPLES = [
+    "12/05/2026", "05-12-26", "2026/05/12", "26.05.12", "1/2/2026",
+    "15 mar 2026", "15 march 26", "31/02/2026", "13/05/2026", "12.05.2026",
+]
+
+LEGACY_FORMATS = [
+    '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d',
+    '%d-%m-%Y', '%m-%d-%Y', '%Y-%m-%d',
+    '%d.%m.%Y', '%m.%d.%Y', '%Y.%m.%d',
+    '%d/%m/%y', '%m/%d/%y', '%y/%m/%d',
+    '%d-%m-%y', '%m-%d-%y', '%y-%m-%d',
+    '%d.%m.%y', '%m.%d.%y', '%y.%m.%d',
+    '%d %b %Y', '%d %B %Y',
+    '%b %d %Y', '%B %d %Y',
+    '%d %b %y', '%d %B %y',
+    '%b %d %y', '%B %d %y'
+]
+
+
+def legacy_parse(date_str):
+    """The strptime loop ocr.py used before dates.py"""
+    date_str = date_str.strip()
+    for fmt in LEGACY_FORMATS:
+        try:
+            parsed_date = datetime.strptime(date_str, fmt)
+            if parsed_date.year < 1950:
+                if parsed_date.year < 30:
+                    parsed_date = parsed_date.replace(year=parsed_date.year + 2000)
+                else:
+                    parsed_date = parsed_date.replace(year=parsed_date.year + 1900)
+            return parsed_date
+        except ValueError:
+            continue
+    return None
+
+
+def uncached_parse(date_str):
+    """Tokenizing parser with its memo bypassed, to measure the parse itself"""
+    return parse_date_candidates.__wrapped__(date_str)
+
+
+def bench(label, func, number):
+    seconds = timeit.timeit(lambda: [func(s) for s in SAMPLES], number=number)
+    per_call = seconds / (number * len(SAMPLES)) * 1e6
+    print(f"{label:<28} {per_call:8.2f} µs/parse")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="Repetitions over the sample set")
+    args = parser.parse_args()
+
+    mismatches = [s for s in SAMPLES if legacy_parse(s) != parse_date_string(s)]
+    print(f"Samples: {len(SAMPLES)}, results differing from legacy loop: {mismatches or 'none'}\n")
+
+    legacy = bench("strptime loop (legacy)", legacy_parse, args.number)
+    bench("tokenizing parser", uncached_parse, args.number)
+    bench("tokenizing parser (memo)", parse_date_string, args.number)
+
+    try:
+        import dateparser
+    except ImportError:
+        print("dateparser not installed, skipping")
+        return
+    number = max(1, args.number // 100)
+    dp = bench("dateparser.parse", dateparser.parse, number)
+    print(f"\ndateparser is {dp / legacy:.1f}x the legacy loop")
+
+
+if __name__ == "__main__":
+    main()
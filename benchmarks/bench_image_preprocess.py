@@ -0,0 +1,132 @@
+"""
+Benchmark: OCR payload size before and after ocr_preprocess.preprocess_for_ocr
+
+For each label image, prints the raw and preprocessed sizes and the
+preprocessing time. When Tesseract is installed, both payloads are read
+with it offline and the detected expiry dates compared; with --ocr (needs the
+Azure Document Intelligence credentials) they are also analyzed by Azure, with
+upload+analysis latency for each. The date match rate is the share of labels
+whose preprocessed payload gives the date read from the raw photo.
+
+Run from the repository root:
+    python benchmarks/bench_image_preprocess.py labels/*.jpg [--ocr] [--auto-crop]
+
+Without image arguments a synthetic 12 MP label photo is generated.
+"""
+import io
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_preprocess import preprocess_for_ocr  # noqa: E402
+from ocr_engines import TesseractEngine  # noqa: E402
+from ocr_result import OCRResult  # noqa: E402
+from dates import find_date_candidates  # noqa: E402
+
+
+def synthetic_label(width=4032, height=3024):
+    """A phone-sized noisy photo with an expiry line on it, encoded as a high quality JPEG"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    noise = Image.effect_noise((width, height), 48)
+    photo = Image.merge("RGB", (noise, noise.rotate(90, expand=False), noise.transpose(Image.FLIP_LEFT_RIGHT)))
+    draw = ImageDraw.Draw(photo)
+    try:
+        font = ImageFont.truetype("DejaVuSans-Bold.ttf", 140)
+    except OSError:
+        font = ImageFont.load_default()
+    draw.rectangle((900, 1100, 3100, 1900), fill="white")
+    draw.text((1000, 1200), "FRESH MILK 1L", fill="black", font=font)
+    draw.text((1000, 1500), "EXP 12/05/2026", fill="black", font=font)
+
+    output = io.BytesIO()
+    photo.save(output, format="JPEG", quality=95)
+    return "synthetic-label.jpg", output.getvalue()
+
+
+def analyze(service, payload):
+    """Detected expiry date and seconds spent on upload + analysis, bypassing the OCR cache"""
+    started = time.perf_counter()
+    poller = service.client.begin_analyze_document(
+        "prebuilt-read", payload, content_type="application/octet-stream")
+    text = service._extract_text_from_result(poller.result())
+    elapsed = time.perf_counter() - started
+    return service._parse_product_information(text).expiry_date, elapsed
+
+
+def analyze_offline(engine, payload):
+    """Detected expiry date and seconds spent on a local Tesseract read"""
+    started = time.perf_counter()
+    ocr_text = engine.analyze(payload)
+    elapsed = time.perf_counter() - started
+    return OCRResult(find_date_candidates(ocr_text.text)).expiry_date, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="label photos; a synthetic one is used if none are given")
+    parser.add_argument("--ocr", action="store_true", help="also compare Azure results for raw and preprocessed")
+    parser.add_argument("--auto-crop", action="store_true", help="enable label auto-cropping")
+    args = parser.parse_args()
+
+    samples = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            samples.append((os.path.basename(path), f.read()))
+    if not samples:
+        samples.append(synthetic_label())
+
+    readers = {}
+    tesseract = TesseractEngine()
+    if tesseract.available():
+        # Warm up the worker pool so the first label is not charged for it
+        tesseract.analyze(samples[0][1])
+        readers["tesseract"] = lambda payload: analyze_offline(tesseract, payload)
+    else:
+        print("⚠ Tesseract is not installed; skipping the offline date comparison")
+    if args.ocr:
+        from ocr import get_ocr_service
+        service = get_ocr_service()
+        if not service.client:
+            parser.error("--ocr needs AZURE_DOC_INTELLIGENCE_ENDPOINT and AZURE_DOC_INTELLIGENCE_KEY")
+        readers["azure"] = lambda payload: analyze(service, payload)
+
+    total_raw = total_prepared = 0
+    # Per reader: labels with a date on the raw photo, and how many of those the preprocessed payload matched
+    dated = dict.fromkeys(readers, 0)
+    matches = dict.fromkeys(readers, 0)
+    for name, raw in samples:
+        started = time.perf_counter()
+        prepared = preprocess_for_ocr(raw, auto_crop=args.auto_crop)
+        prep_ms = (time.perf_counter() - started) * 1000
+        total_raw += len(raw)
+        total_prepared += len(prepared)
+        line = (f"{name}: {len(raw) / 1024:9.1f} KiB -> {len(prepared) / 1024:8.1f} KiB "
+                f"({100 * (1 - len(prepared) / len(raw)):4.1f}% saved, {prep_ms:6.1f} ms)")
+
+        for reader_name, read in readers.items():
+            raw_date, raw_s = read(raw)
+            prepared_date, prepared_s = read(prepared)
+            if raw_date is not None:
+                dated[reader_name] += 1
+                matches[reader_name] += raw_date == prepared_date
+            line += (f" | {reader_name}: raw {raw_date and raw_date.date()} in {raw_s:.2f}s,"
+                     f" preprocessed {prepared_date and prepared_date.date()} in {prepared_s:.2f}s")
+        print(line)
+    tesseract.shutdown()
+
+    print(f"\nTotal: {total_raw / 1024 / 1024:.2f} MiB -> {total_prepared / 1024 / 1024:.2f} MiB "
+          f"({100 * (1 - total_prepared / total_raw):.1f}% saved)")
+    for reader_name in readers:
+        if dated[reader_name]:
+            print(f"{reader_name}: date match rate {100 * matches[reader_name] / dated[reader_name]:.0f}% "
+                  f"({matches[reader_name]} of {dated[reader_name]} label(s) dated on the raw photo)")
+        else:
+            print(f"{reader_name}: no expiry date read from any raw photo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Import-time benchmark for the app's entry points, based on `python -X importtime`
+
+Each target is imported in a fresh interpreter and the cumulative times that
+-X importtime reports for its top-level imports are summed. For app.py only
+its module-level import statements are executed (running the Streamlit script
+itself needs a server), which is what the login page waits on before its
+first render.
+
+Run from the repository root:
+    python benchmarks/bench_import_time.py [--repeat 5] [--top 10]
+"""
+import os
+import re
+import ast
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules read required settings at import; placeholders keep them importable offline
+PLACEHOLDER_ENV = {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "EMAIL_ADDRESS": "bench@example.com",
+    "EMAIL_PASSWORD": "bench",
+}
+
+LINE_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def script_imports(path):
+    """The module-level import statements of a script, as source code"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def targets():
+    return {
+        "app.py (imports before first render)": script_imports(os.path.join(ROOT, "app.py")),
+        "ocr.py": "import ocr",
+        "send_expiry_notifications.py": "import send_expiry_notifications",
+    }
+
+
+def measure(code):
+    """
+    Import code in a fresh interpreter
+
+    Returns:
+        tuple: (total microseconds, {top-level module: cumulative microseconds})
+    """
+    env = dict(os.environ)
+    for key, value in PLACEHOLDER_ENV.items():
+        env.setdefault(key, value)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        # Nested imports are indented by two spaces per level; top level has one
+        if match and len(match.group(3)) == 1:
+            modules[match.group(4)] = int(match.group(2))
+    return sum(modules.values()), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per target; the fastest is reported")
+    parser.add_argument("--top", type=int, default=10, help="heaviest top-level imports to list")
+    args = parser.parse_args()
+
+    for label, code in targets().items():
+        try:
+            runs = [measure(code) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{label}: failed to import ({e})\n")
+            continue
+        total, modules = min(runs, key=lambda run: run[0])
+        print(f"{label}: {total / 1000:.1f} ms (best of {args.repeat})")
+        for name, micros in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {micros / 1000:8.1f} ms  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
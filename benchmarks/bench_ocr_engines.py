@@ -0,0 +1,80 @@
+"""
+Benchmark: OCR latency and detected dates per engine, and where the local-first router sends each label
+
+Engines that are not available (no tesseract binary, no Azure credentials)
+are skipped, so this runs offline with Tesseract alone.
+
+Run from the repository root:
+    python benchmarks/bench_ocr_engines.py labels/*.jpg [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_engines import NO_OCR_ENGINE_MESSAGE, OCRRouter, expiry_confidence  # noqa: E402
+from ocr_result import OCRResult  # noqa: E402
+from dates import find_date_candidates  # noqa: E402
+
+
+def timed(engine, image_bytes, repeat):
+    """(last OCRText, median seconds) over repeat reads"""
+    timings = []
+    ocr_text = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        ocr_text = engine.analyze(image_bytes)
+        timings.append(time.perf_counter() - started)
+    return ocr_text, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="+", help="label photos")
+    parser.add_argument("--repeat", type=int, default=3, help="reads per image and engine; the median is reported")
+    args = parser.parse_args()
+
+    from ocr import get_ocr_service
+
+    # Engines are called directly, so the OCR cache is never consulted
+    router = get_ocr_service().engine
+    engines = {engine.name: engine for engine in (router.local, router.remote)
+               if engine is not None and engine.available()}
+    if not engines:
+        parser.error(NO_OCR_ENGINE_MESSAGE)
+    engines["router"] = OCRRouter(router.local, router.remote, router.min_confidence)
+
+    # Warm up pools and connections so the first label is not charged for them
+    with open(args.images[0], "rb") as f:
+        first = f.read()
+    for engine in engines.values():
+        engine.analyze(first)
+
+    latencies = {name: [] for name in engines}
+    routed = {}
+    for path in args.images:
+        with open(path, "rb") as f:
+            image_bytes = f.read()
+        cells = []
+        for name, engine in engines.items():
+            ocr_text, seconds = timed(engine, image_bytes, args.repeat)
+            latencies[name].append(seconds)
+            expiry = OCRResult(find_date_candidates(ocr_text.text)).expiry_date
+            label = f"{name} {expiry and expiry.date()} ({expiry_confidence(ocr_text):.2f}) {seconds * 1000:.0f} ms"
+            if name == "router":
+                routed[ocr_text.engine] = routed.get(ocr_text.engine, 0) + 1
+                label += f" via {ocr_text.engine}"
+            cells.append(label)
+        print(f"{os.path.basename(path)}: " + " | ".join(cells))
+
+    print()
+    for name, values in latencies.items():
+        print(f"{name:10s} median {statistics.median(values) * 1000:8.0f} ms over {len(values)} label(s)")
+    print("router sent " + ", ".join(f"{count} to {name}" for name, count in routed.items()))
+
+
+if __name__ == "__main__":
+    main()
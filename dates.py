@@ -0,0 +1,230 @@
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+# Whether ambiguous numeric dates (04/05/2026) are read day first; the other reading is kept as an alternative
+DATE_DAY_FIRST = os.getenv("DATE_DAY_FIRST", "true").lower() != "false"
+
+# Keyword prefixes that mark a date as the expiry date on a label
+_KEYWORD = r'(?:exp|expiry|expires|best\s+before|use\s+by|bb|best\s+by)\s*:?\s*'
+_MONTHS = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)'
+
+# One alternation over every supported layout, in priority order. The regex
+# engine tries alternatives left to right at each position, so a keyword-led
+# date wins over the bare date it contains.
+_DATE_ALTERNATIVES = [
+    ('kw_numeric', _KEYWORD + r'(?P<kw_numeric>\d{1,2}[/-]\d{1,2}[/-]\d{2,4})'),
+    ('kw_text', _KEYWORD + r'(?P<kw_text>\d{1,2}\s+\w{3,9}\s+\d{2,4})'),
+    ('kw_dotted', r'(?:exp|expiry|expires)\s*:?\s*(?P<kw_dotted>\d{1,2}\.\d{1,2}\.\d{2,4})'),
+    ('numeric', r'(?P<numeric>\d{1,2}[/-]\d{1,2}[/-]\d{2,4})'),
+    ('year_first', r'(?P<year_first>\d{2,4}[/-]\d{1,2}[/-]\d{1,2})'),
+    ('text', r'(?P<text>\d{1,2}\s+' + _MONTHS + r'\w*\s+\d{2,4})'),
+    ('dotted', r'(?P<dotted>\d{1,2}\.\d{1,2}\.\d{2,4})'),
+]
+
+EXPIRY_DATE_PATTERN = re.compile('|'.join(pattern for _, pattern in _DATE_ALTERNATIVES))
+
+# How likely a match of each layout is the expiry date, in the same order as
+# _DATE_ALTERNATIVES: a keyword in front outweighs any bare date
+KIND_SCORES = {
+    'kw_numeric': 0.95,
+    'kw_text': 0.9,
+    'kw_dotted': 0.85,
+    'numeric': 0.6,
+    'year_first': 0.55,
+    'text': 0.5,
+    'dotted': 0.45,
+}
+
+# Lowest score for each confidence label, highest first
+CONFIDENCE_LEVELS = ((0.8, 'high'), (0.4, 'medium'), (0.0, 'low'))
+
+_MONTH_NAMES = [
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december'
+]
+# Full names and three-letter abbreviations, as accepted by strptime's %B/%b
+MONTH_LOOKUP = {name: i for i, name in enumerate(_MONTH_NAMES, 1)}
+MONTH_LOOKUP.update({name[:3]: i for i, name in enumerate(_MONTH_NAMES, 1)})
+
+_TOKEN_PATTERN = re.compile(r'\d+|[a-z]+')
+_SEPARATORS = set('/-. ')
+
+
+def confidence_label(score: Optional[float]) -> Optional[str]:
+    """Map a 0-1 score onto 'high' / 'medium' / 'low'"""
+    if score is None:
+        return None
+    for threshold, label in CONFIDENCE_LEVELS:
+        if score >= threshold:
+            return label
+    return 'low'
+
+
+class DateCandidate(NamedTuple):
+    """
+    A date found in OCR text, with where it was found and how much we trust it (0-1)
+
+    date is the preferred reading; alternatives holds the other valid readings
+    of the same text (04/05/2026 is 4 May or 5 April), so callers can ask.
+    """
+    date: datetime
+    text: str
+    start: int
+    end: int
+    kind: str
+    score: float
+    alternatives: Tuple[datetime, ...] = ()
+
+    @property
+    def confidence(self) -> str:
+        return confidence_label(self.score)
+
+    @property
+    def ambiguous(self) -> bool:
+        return bool(self.alternatives)
+
+
+def _expand_year(year: int, width: int) -> int:
+    """Apply the 2-digit year pivot used by strptime's %y (00-68 -> 20xx)"""
+    if width == 2 or year < 100:
+        return year + (2000 if year < 69 else 1900)
+    return year
+
+
+def _build(year: int, month: int, day: int) -> Optional[datetime]:
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def parse_date_candidates(date_str: str, day_first: bool = DATE_DAY_FIRST) -> Tuple[datetime, ...]:
+    """
+    Parse a label date string into every valid interpretation
+
+    The string is tokenized once; the separator and field widths decide which
+    constructor to call, so there is no format trial loop. Ambiguous numeric
+    dates such as 04/05/2026 yield both readings, preferred order first.
+
+    Args:
+        date_str (str): Date string to parse, e.g. "12/05/26" or "15 Mar 2026"
+        day_first (bool): Prefer day/month over month/day for numeric dates
+
+    Returns:
+        tuple: Valid datetimes, most likely interpretation first (may be empty)
+    """
+    text = date_str.strip().lower()
+    tokens = _TOKEN_PATTERN.findall(text)
+    if len(tokens) != 3 or not set(_TOKEN_PATTERN.sub('', text)) <= _SEPARATORS:
+        return ()
+
+    widths = [len(t) for t in tokens]
+    numeric = [t.isdigit() for t in tokens]
+    candidates = []
+
+    if all(numeric):
+        a, b, c = (int(t) for t in tokens)
+        if widths[0] == 4:
+            # 2026/05/12
+            if widths[2] <= 2 and widths[1] <= 2:
+                candidates.append(_build(_expand_year(a, 4), b, c))
+        elif widths[0] <= 2 and widths[1] <= 2 and widths[2] in (2, 4):
+            year = _expand_year(c, widths[2])
+            orders = [(b, a), (a, b)] if day_first else [(a, b), (b, a)]
+            candidates.extend(_build(year, month, day) for month, day in orders)
+            if widths == [2, 2, 2]:
+                # 26/05/12 can also be year first
+                candidates.append(_build(_expand_year(a, 2), b, c))
+    elif numeric == [True, False, True] and widths[0] <= 2 and widths[2] in (2, 4):
+        # 15 mar 2026
+        month = MONTH_LOOKUP.get(tokens[1])
+        if month:
+            candidates.append(_build(_expand_year(int(tokens[2]), widths[2]), month, int(tokens[0])))
+    elif numeric == [False, True, True] and widths[1] <= 2 and widths[2] in (2, 4):
+        # mar 15 2026
+        month = MONTH_LOOKUP.get(tokens[0])
+        if month:
+            candidates.append(_build(_expand_year(int(tokens[2]), widths[2]), month, int(tokens[1])))
+
+    unique = []
+    for candidate in candidates:
+        if candidate is not None and candidate not in unique:
+            unique.append(candidate)
+    return tuple(unique)
+
+
+def parse_date_string(date_str: str, day_first: bool = DATE_DAY_FIRST) -> Optional[datetime]:
+    """
+    Parse various date string formats into a standardized datetime object
+
+    Args:
+        date_str (str): Date string to parse
+        day_first (bool): Prefer day/month over month/day for numeric dates
+
+    Returns:
+        datetime or None: Most likely interpretation
+    """
+    candidates = parse_date_candidates(date_str, day_first)
+    return candidates[0] if candidates else None
+
+
+def parse_stored_date(value) -> Optional[datetime]:
+    """
+    Normalize an expiry value read back from MongoDB
+
+    Datetimes pass through; strings try ISO format and the label parser before
+    falling back to dateparser for free-form text.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return datetime.fromisoformat(value.strip())
+    except ValueError:
+        pass
+    parsed = parse_date_string(value)
+    if parsed is None:
+        import dateparser
+        parsed = dateparser.parse(value)
+    return parsed
+
+
+def find_date_candidates(text: str, day_first: bool = DATE_DAY_FIRST) -> List[DateCandidate]:
+    """
+    Find every parseable date in OCR text in a single regex pass
+
+    Ambiguous dates keep their other readings in DateCandidate.alternatives.
+
+    Args:
+        text (str): Raw text extracted from OCR
+        day_first (bool): Prefer day/month over month/day for numeric dates
+
+    Returns:
+        list: DateCandidate entries in order of appearance
+    """
+    candidates = []
+    for match in EXPIRY_DATE_PATTERN.finditer(text.lower()):
+        kind = match.lastgroup
+        date_str = match.group(kind)
+        readings = parse_date_candidates(date_str, day_first)
+        if readings:
+            candidates.append(DateCandidate(
+                date=readings[0],
+                text=date_str,
+                start=match.start(kind),
+                end=match.end(kind),
+                kind=kind,
+                score=KIND_SCORES[kind],
+                alternatives=readings[1:]
+            ))
+    return candidates
+
+
+def best_expiry_candidate(candidates: List[DateCandidate]) -> Optional[DateCandidate]:
+    """Pick the most trustworthy candidate: highest score first, then earliest in the text"""
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: (c.score, -c.start))
@@ -0,0 +1,71 @@
+"""
+Process-wide MongoDB connection
+
+Every module gets its database through get_db(); the MongoClient behind it is
+created on first use and shared, so importing a module never touches the
+network and the app, scheduler and notification job draw from one pool.
+"""
+import os
+import threading
+from pymongo import MongoClient
+from pymongo.database import Database
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_NAME = os.getenv("MONGO_DB_NAME", "grocery_db")
+
+# Connection pool and timeouts, shared by every thread in the process
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 5 * 60 * 1000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> MongoClient:
+    """
+    The shared MongoClient, created on first call
+
+    Creating the client starts pymongo's background monitoring but does not
+    wait for the server; the first operation does.
+
+    Raises:
+        KeyError: If MONGO_URI is not set
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MongoClient(
+                os.environ["MONGO_URI"],
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                appname="grocery-expiry-tracker"
+            )
+        return _client
+
+
+def get_db(name: str = DB_NAME) -> Database:
+    return get_client()[name]
+
+
+def ping():
+    """Round trip to the server; raises if it cannot be reached within the selection timeout"""
+    get_client().admin.command("ping")
+
+
+def close_client():
+    """Close the shared client; the next get_client() opens a new one"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,65 @@
+import csv
+import io
+from typing import Iterable, Iterator, List, Tuple
+
+EXPORT_COLUMNS = ("Name", "Expiry Date", "Days Left", "Status")
+
+
+def export_rows(products) -> List[Tuple]:
+    """Flatten product dicts (with expiry_dt, days_left, status) into export rows"""
+    return [
+        (p["name"], p["expiry_dt"].strftime("%Y-%m-%d"), p["days_left"], p["status"])
+        for p in products
+    ]
+
+
+def iter_csv(rows: Iterable[Tuple]) -> Iterator[bytes]:
+    """Yield the CSV export one encoded line at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in (EXPORT_COLUMNS, *rows):
+        writer.writerow(row)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def build_csv(rows: Iterable[Tuple]) -> bytes:
+    return b"".join(iter_csv(rows))
+
+
+def build_excel(rows: Iterable[Tuple]) -> bytes:
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows instead of keeping a cell grid in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Products")
+    sheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def build_pdf(rows: Iterable[Tuple]) -> bytes:
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt="Grocery Product List", ln=True, align='C')
+    pdf.ln(10)
+    for name, expiry, days_left, status in rows:
+        line = f"{name} | {expiry} | {days_left} days | {status}"
+        pdf.multi_cell(0, 10, txt=line)
+    return pdf.output(dest='S').encode('latin-1')
+
+
+# label -> (builder, file name, mime type, button label)
+EXPORT_FORMATS = {
+    "CSV": (build_csv, "grocery_products.csv", "text/csv", "💾 Export as CSV"),
+    "Excel": (build_excel, "grocery_products.xlsx",
+              "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "📊 Export as Excel"),
+    "PDF": (build_pdf, "grocery_products.pdf", "application/pdf", "📄 Export as PDF"),
+}
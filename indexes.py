@@ -0,0 +1,148 @@
+"""
+Index bootstrap and query-plan checks for grocery_db
+
+Run directly to create any missing indexes and verify that the app's hot
+queries are index-backed:
+    python indexes.py
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from db import get_db
+from alerts import due_alerts_pipeline
+
+logger = logging.getLogger(__name__)
+
+# collection -> [(keys, options)]
+INDEXES = {
+    "products": [
+        ([("user_email", ASCENDING), ("is_deleted", ASCENDING), ("expiry", ASCENDING)],
+         {"name": "user_active_expiry"}),
+        ([("expiry", ASCENDING), ("is_deleted", ASCENDING)],
+         {"name": "expiry_active"}),
+        # One product per owner and label photo for ocr_backfill.py re-runs
+        ([("user_email", ASCENDING), ("ocr_source", ASCENDING)],
+         {"name": "user_ocr_source_unique", "unique": True,
+          "partialFilterExpression": {"ocr_source": {"$exists": True}}}),
+    ],
+    "notifications": [
+        # One reminder per threshold for each expiry date a product has had
+        ([("product_id", ASCENDING), ("threshold", ASCENDING), ("expiry", ASCENDING)],
+         {"name": "product_threshold_expiry_unique", "unique": True}),
+    ],
+    "users": [
+        ([("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    ],
+}
+
+
+# collection -> index names replaced by an entry in INDEXES, dropped by ensure_indexes
+OBSOLETE_INDEXES = {
+    # Unique on (product_id, threshold) would block the reminder for a new expiry
+    "notifications": ["product_threshold_unique"],
+}
+
+
+class CollectionScanError(RuntimeError):
+    """Raised when a query the app depends on is planned as a full collection scan"""
+
+
+def ensure_indexes(db) -> List[str]:
+    """
+    Create every index in INDEXES and drop OBSOLETE_INDEXES; safe to run repeatedly
+
+    Returns:
+        list: "collection.index_name" for each ensured index
+
+    Raises:
+        OperationFailure: The first index that could not be built, after trying all of them
+    """
+    for collection_name, names in OBSOLETE_INDEXES.items():
+        existing = db[collection_name].index_information()
+        for name in names:
+            if name in existing:
+                db[collection_name].drop_index(name)
+                logger.info(f"Dropped obsolete index {collection_name}.{name}")
+
+    ensured = []
+    failures = []
+    for collection_name, specs in INDEXES.items():
+        for keys, options in specs:
+            # One index that cannot be built (e.g. duplicate emails) does not hold back the others
+            try:
+                name = db[collection_name].create_index(keys, **options)
+            except OperationFailure as e:
+                logger.error(f"Index {collection_name}.{options['name']} could not be built: {e}")
+                failures.append(e)
+                continue
+            ensured.append(f"{collection_name}.{name}")
+    logger.info(f"Ensured indexes: {', '.join(ensured)}")
+    if failures:
+        raise failures[0]
+    return ensured
+
+
+def app_queries(now: datetime = None) -> List[Tuple[str, str, Dict[str, Any], Any]]:
+    """Representative (label, collection, filter, sort) for each hot query"""
+    # Imported here so the notification job can ensure indexes without numpy
+    from products import build_product_query, PRODUCT_SORT
+
+    now = now or datetime.now()
+    email = "plan-check@example.com"
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        ("live product cache", "products", {"user_email": email}, None),
+        ("products page", "products", build_product_query(email, "Expiring This Week", "milk", now), PRODUCT_SORT),
+        # The first stage of the alert pipeline, so the check follows any change to its window
+        ("due notifications", "products", due_alerts_pipeline(now, "notifications")[0]["$match"], None),
+        ("notification ledger", "notifications", {"product_id": None, "threshold": 3, "expiry": today}, None),
+        ("login / register", "users", {"email": email}, None),
+    ]
+
+
+def _plan_stages(plan: Dict[str, Any]):
+    """Yield every stage name in an explain() plan tree"""
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+    if "queryPlan" in plan:  # slot-based execution engine wraps the classic plan
+        yield from _plan_stages(plan["queryPlan"])
+
+
+def check_query_plans(db, now: datetime = None) -> Dict[str, List[str]]:
+    """
+    Explain each app query and fail if any winning plan is a COLLSCAN
+
+    Returns:
+        dict: Query label -> stages of its winning plan
+
+    Raises:
+        CollectionScanError: If any query falls back to a collection scan
+    """
+    plans = {}
+    scans = []
+    for label, collection_name, query, sort in app_queries(now):
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = [stage for stage in _plan_stages(winning_plan) if stage]
+        plans[label] = stages
+        if "COLLSCAN" in stages:
+            scans.append(label)
+
+    if scans:
+        raise CollectionScanError(f"Queries without index support: {', '.join(scans)}")
+    return plans
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    db = get_db()
+    ensure_indexes(db)
+    for label, stages in check_query_plans(db).items():
+        print(f"✅ {label}: {' -> '.join(stages)}")
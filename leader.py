@@ -0,0 +1,68 @@
+import os
+import uuid
+import socket
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder_id() -> str:
+    """Identify this process uniquely across replicas"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class MongoLease:
+    """
+    Lease-based leader election on a MongoDB document
+
+    The lease is a document {_id: name, holder, expires_at}. A process becomes
+    leader by taking over an expired lease (or renewing its own) in a single
+    atomic find_one_and_update; the unique _id makes concurrent upserts from
+    other replicas fail with DuplicateKeyError. The holder must keep calling
+    acquire() more often than ttl_seconds to stay leader.
+    """
+
+    def __init__(self, collection, name: str, ttl_seconds: float = 180, holder: str = None):
+        self.collection = collection
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.holder = holder or default_holder_id()
+        self._expires_at = None
+
+    def acquire(self) -> bool:
+        """Acquire or renew the lease; returns True if this process is the leader"""
+        now = datetime.now(timezone.utc)
+        try:
+            lease = self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"expires_at": {"$lt": now}}, {"holder": self.holder}]},
+                {"$set": {"holder": self.holder, "expires_at": now + self.ttl}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another replica holds an unexpired lease
+            self._expires_at = None
+            return False
+        except PyMongoError as e:
+            logger.error(f"Lease {self.name} could not be acquired: {e}")
+            self._expires_at = None
+            return False
+
+        self._expires_at = now + self.ttl
+        return lease is not None and lease.get("holder") == self.holder
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this process held the lease at its last successful acquire and it has not lapsed"""
+        return self._expires_at is not None and datetime.now(timezone.utc) < self._expires_at
+
+    def release(self):
+        """Give up the lease so another replica can take over immediately"""
+        try:
+            self.collection.delete_one({"_id": self.name, "holder": self.holder})
+        except PyMongoError as e:
+            logger.error(f"Lease {self.name} could not be released: {e}")
+        self._expires_at = None
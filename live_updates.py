@@ -0,0 +1,260 @@
+"""
+Live per-user product cache kept current by a MongoDB change stream
+
+The app reads each user's products from memory; a background thread applies
+inserts, updates and deletes from a change stream on the products collection
+filtered to the users currently cached. Where change streams are unavailable
+(a standalone mongod) the thread falls back to polling those users instead.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# "auto" uses a change stream and falls back to polling, "stream" or "poll" forces one
+LIVE_UPDATES_MODE = os.environ.get("LIVE_UPDATES_MODE", "auto").lower()
+
+# Seconds between re-reads in polling mode, and between retries after a stream error
+LIVE_POLL_SECONDS = float(os.environ.get("LIVE_POLL_SECONDS", 5))
+
+# How often an open page checks whether its user's products changed
+LIVE_REFRESH_SECONDS = float(os.environ.get("LIVE_REFRESH_SECONDS", 2))
+
+# Users kept in memory; the least recently read are dropped first
+LIVE_CACHE_MAX_USERS = int(os.environ.get("LIVE_CACHE_MAX_USERS", 256))
+
+# How long one wait on the stream blocks before checking for stop or new users
+STREAM_AWAIT_MS = 1000
+
+# Server errors meaning change streams are not available at all:
+# IllegalOperation, unrecognized $changeStream stage, not a replica set
+CHANGE_STREAM_UNSUPPORTED = {20, 40324, 40573}
+
+# The resume token fell out of the oplog: ChangeStreamHistoryLost, ChangeStreamFatalError
+CHANGE_STREAM_HISTORY_LOST = {280, 286}
+
+
+class UserProducts:
+    """One user's products (active and deleted) with values derived from them"""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.version = 0
+        self._derived = {}
+
+    def put(self, doc: Dict[str, Any]) -> bool:
+        if self.docs.get(doc["_id"]) == doc:
+            return False
+        self.docs[doc["_id"]] = doc
+        self._changed()
+        return True
+
+    def remove(self, product_id) -> bool:
+        if self.docs.pop(product_id, None) is None:
+            return False
+        self._changed()
+        return True
+
+    def replace_all(self, docs: List[Dict[str, Any]]) -> bool:
+        fresh = {doc["_id"]: doc for doc in docs}
+        if fresh == self.docs:
+            return False
+        self.docs = fresh
+        self._changed()
+        return True
+
+    def _changed(self):
+        self.version += 1
+        self._derived.clear()
+
+    def products(self, deleted: bool = False) -> List[Dict[str, Any]]:
+        key = ("products", deleted)
+        if key not in self._derived:
+            self._derived[key] = [doc for doc in self.docs.values() if (doc.get("is_deleted") is True) == deleted]
+        return self._derived[key]
+
+    def derived(self, key: Hashable, func: Callable[[List[Dict[str, Any]]], Any]) -> Any:
+        """func(active products), computed once per version of the products"""
+        if key not in self._derived:
+            self._derived[key] = func(self.products())
+        return self._derived[key]
+
+
+class ProductStore:
+    """
+    Process-wide cache of products per user, updated from MongoDB in the background
+
+    A user's products are read with one query the first time they are asked
+    for; after that every change arrives as a change stream event and is
+    applied to the cached documents, bumping that user's version. Readers
+    compare versions to know when to redraw. When the server has no change
+    streams, subscribed users are re-read every poll_seconds and only changed
+    sets bump the version.
+    """
+
+    def __init__(self, collection, mode: str = LIVE_UPDATES_MODE, poll_seconds: float = LIVE_POLL_SECONDS,
+                 max_users: int = LIVE_CACHE_MAX_USERS):
+        self.collection = collection
+        self.mode = mode
+        self.poll_seconds = poll_seconds
+        self.max_users = max_users
+        # What is feeding the cache right now: "stream" or "poll"
+        self.source = "poll" if mode == "poll" else "stream"
+        self._users: "OrderedDict[str, UserProducts]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._users_changed = threading.Event()
+        self._stopped = threading.Event()
+        self._resume_token = None
+        self._thread = None
+
+    # ---- reads ----
+    def products(self, user_email: str, deleted: bool = False) -> List[Dict[str, Any]]:
+        """The user's active (or deleted) products; do not mutate the returned documents"""
+        entry = self._entry(user_email)
+        with self._lock:
+            return entry.products(deleted)
+
+    def derived(self, user_email: str, key: Hashable, func: Callable[[List[Dict[str, Any]]], Any]) -> Any:
+        """func over the user's active products, recomputed only after they change"""
+        entry = self._entry(user_email)
+        with self._lock:
+            return entry.derived(key, func)
+
+    def version(self, user_email: str) -> int:
+        entry = self._entry(user_email)
+        with self._lock:
+            return entry.version
+
+    def refresh_product(self, user_email: str, product_id):
+        """Re-read one product after a local write so the writer sees it before its change event"""
+        self.refresh_products(user_email, [product_id])
+
+    def refresh_products(self, user_email: str, product_ids: Iterable[Any]):
+        """refresh_product for a bulk write, with one query for all the ids"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        docs = {doc["_id"]: doc for doc in self.collection.find({"_id": {"$in": product_ids}})}
+        with self._lock:
+            entry = self._users.get(user_email)
+            if entry is None:
+                return
+            for product_id in product_ids:
+                doc = docs.get(product_id)
+                if doc is None or doc.get("user_email") != user_email:
+                    entry.remove(product_id)
+                else:
+                    entry.put(doc)
+
+    def _entry(self, user_email: str) -> UserProducts:
+        with self._lock:
+            entry = self._users.get(user_email)
+            if entry is not None:
+                self._users.move_to_end(user_email)
+                return entry
+        # Load outside the lock so other users' reads and the watcher are not held up
+        docs = list(self.collection.find({"user_email": user_email}))
+        with self._lock:
+            entry = self._users.get(user_email)
+            if entry is not None:
+                return entry
+            entry = self._users[user_email] = UserProducts(docs)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            # Restart the stream from its last token so the new user's filter covers the snapshot gap
+            self._users_changed.set()
+            return entry
+
+    # ---- background updates ----
+    def start(self) -> threading.Thread:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name="product-live-updates", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def stop(self, wait: bool = True):
+        self._stopped.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self.source == "poll":
+                self._poll()
+                self._stopped.wait(self.poll_seconds)
+                continue
+            try:
+                self._watch()
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED and self.mode == "auto":
+                    logger.warning(f"Change streams unavailable ({e}); polling products every {self.poll_seconds}s")
+                    self.source = "poll"
+                    continue
+                if e.code in CHANGE_STREAM_HISTORY_LOST:
+                    logger.warning(f"Change stream could not resume ({e}); reloading cached users")
+                    self._resume_token = None
+                    self._poll()
+                    continue
+                logger.error(f"Product change stream failed: {e}")
+                self._stopped.wait(self.poll_seconds)
+            except PyMongoError as e:
+                logger.error(f"Product change stream failed: {e}")
+                self._stopped.wait(self.poll_seconds)
+
+    def _watch(self):
+        with self._lock:
+            self._users_changed.clear()
+            emails = list(self._users)
+        # Deletes carry no document to filter on, so they are matched for everyone
+        pipeline = [{"$match": {"$or": [
+            {"fullDocument.user_email": {"$in": emails}},
+            {"operationType": {"$nin": ["insert", "update", "replace"]}}
+        ]}}]
+        with self.collection.watch(pipeline, full_document="updateLookup", resume_after=self._resume_token,
+                                   max_await_time_ms=STREAM_AWAIT_MS) as stream:
+            while not self._stopped.is_set() and not self._users_changed.is_set():
+                change = stream.try_next()
+                if change is not None and change["operationType"] == "invalidate":
+                    self._resume_token = None
+                    self._poll()
+                    return
+                if change is not None:
+                    self._apply(change)
+                self._resume_token = stream.resume_token
+
+    def _apply(self, change: Dict[str, Any]):
+        operation = change["operationType"]
+        with self._lock:
+            if operation in ("insert", "update", "replace"):
+                doc = change.get("fullDocument")
+                # None when the product was deleted before the lookup; its delete event follows
+                entry = self._users.get(doc.get("user_email")) if doc else None
+                if entry is not None:
+                    entry.put(doc)
+            elif operation == "delete":
+                for entry in self._users.values():
+                    entry.remove(change["documentKey"]["_id"])
+            elif operation in ("drop", "rename", "dropDatabase"):
+                for entry in self._users.values():
+                    entry.replace_all([])
+
+    def _poll(self):
+        """Re-read every cached user; only users whose products differ get a new version"""
+        with self._lock:
+            emails = list(self._users)
+        for user_email in emails:
+            try:
+                docs = list(self.collection.find({"user_email": user_email}))
+            except PyMongoError as e:
+                logger.error(f"Polling products failed: {e}")
+                return
+            with self._lock:
+                entry = self._users.get(user_email)
+                if entry is not None:
+                    entry.replace_all(docs)
@@ -1,102 +1,122 @@
 import os
 import logging
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.core.credentials import AzureKeyCredential
-from azure.core.exceptions import AzureError, ClientAuthenticationError, ResourceNotFoundError
+import threading
 import re
 from datetime import datetime
 import streamlit as st
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Union, List, NamedTuple
 import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ocr_cache import OCRCache
+from ocr_engines import NO_OCR_ENGINE_MESSAGE, OCRRouter, build_router, text_from_read_result
+from ocr_result import OCRResult, line_spans
+from ocr_throttle import is_throttled
+from dates import find_date_candidates, parse_date_string
 
 # Configure logging for Azure operations
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Largest image accepted for OCR (Azure's request limit)
+MAX_IMAGE_BYTES = 50 * 1024 * 1024
+
+
+class ImageTooLargeError(ValueError):
+    """Raised for images over MAX_IMAGE_BYTES"""
+
+
+class LabelLookup(NamedTuple):
+    """What the OCR cache already knows about an image: its key, a parsed result and/or its text"""
+    key: str
+    result: Optional[OCRResult]
+    text: Optional[str]
+
+
 class AzureDocumentIntelligenceOCR:
     """
-    Azure Document Intelligence OCR service following Azure best practices
+    Label OCR service following Azure best practices
+
+    Text is read by the engines in ocr_engines.py: local Tesseract first when
+    it is installed, Azure Document Intelligence when the local read is not
+    confident enough (OCR_ENGINE selects the policy). Parsing and caching are
+    the same whichever engine read the label.
     """
     
-    def __init__(self):
-        """Initialized the Azure Document Intelligence client with proper error handling"""
+    def __init__(self, cache: Optional[OCRCache] = None, engine: Optional[OCRRouter] = None):
+        """Read the configuration; the Azure SDK is imported and the client built on first use"""
         self.endpoint = os.getenv("AZURE_DOC_INTELLIGENCE_ENDPOINT")
         self.key = os.getenv("AZURE_DOC_INTELLIGENCE_KEY")
-        self.client = None
-        
+        self.cache = cache if cache is not None else OCRCache.from_env()
+        self.max_workers = int(os.getenv("OCR_MAX_WORKERS", 4))
+        self.engine = engine if engine is not None else build_router(self.endpoint, self.key, lambda: self.client)
+        self._client = None
+        self._client_initialized = False
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The Azure Document Intelligence client, or None if it could not be initialized"""
+        with self._client_lock:
+            if not self._client_initialized:
+                self._client_initialized = True
+                self._client = self._create_client()
+            return self._client
+
+    def _create_client(self):
+        """Initialize the Azure Document Intelligence client with proper error handling"""
         if not self.endpoint or not self.key:
             logger.error("Azure Document Intelligence credentials not found")
             st.error("Azure Document Intelligence credentials not configured. Please check your environment variables.")
-            return
+            return None
+        
+        from azure.ai.documentintelligence import DocumentIntelligenceClient
+        from azure.core.credentials import AzureKeyCredential
+        from azure.core.exceptions import ClientAuthenticationError
         
         try:
-            self.client = DocumentIntelligenceClient(
+            client = DocumentIntelligenceClient(
                 endpoint=self.endpoint,
-                credential=AzureKeyCredential(self.key)
+                credential=AzureKeyCredential(self.key),
+                # Throttled responses are retried by ocr_throttle, shared with every other caller
+                retry_status=0
             )
             logger.info("Azure Document Intelligence client initialized successfully")
+            return client
         except ClientAuthenticationError as e:
             logger.error(f"Authentication failed: {e}")
             st.error("Azure authentication failed. Please check your credentials.")
         except Exception as e:
             logger.error(f"Failed to initialize Azure client: {e}")
             st.error(f"Failed to initialize Azure service: {str(e)}")
+        return None
 
-    def extract_expiry_date(self, image_file) -> Optional[Dict[str, Any]]:
+    def extract_expiry_date(self, image_file, image=None, keep_text: bool = False) -> Optional[OCRResult]:
         """
         Extract expiry date and other product information from an image
         
         Args:
             image_file: Uploaded image file (from Streamlit file_uploader)
+            image: The same file already decoded with PIL, reused for preprocessing
+            keep_text (bool): Keep the full OCR text on the result as raw_text
         
         Returns:
-            dict: Contains extracted information including expiry_date, product_name, etc.
+            OCRResult: Date candidates and expiry_date, product_name, etc.
         """
-        if not self.client:
-            st.error("Azure Document Intelligence client not initialized")
+        if not self.engine.available():
+            st.error(f"❌ {NO_OCR_ENGINE_MESSAGE}")
             return None
+        
+        from azure.core.exceptions import AzureError, ClientAuthenticationError, ResourceNotFoundError
             
         try:
-            # Reset file pointer if needed
-            if hasattr(image_file, 'seek'):
-                image_file.seek(0)
-            
-            # Read the image file
-            if hasattr(image_file, 'read'):
-                image_bytes = image_file.read()
-            else:
-                image_bytes = image_file
-            
-            # Validate file size (Azure has limits)
-            if len(image_bytes) > 50 * 1024 * 1024:  # 50MB limit
-                st.error("File size too large. Please use an image smaller than 50MB.")
-                return None
-            
-            # Analyze the document using the prebuilt-read model
-            logger.info("Starting document analysis with Azure Document Intelligence")
-            
-            poller = self.client.begin_analyze_document(
-                "prebuilt-read",
-                analyze_request=image_bytes,
-                content_type="application/octet-stream"
-            )
-            
-            # Wait for the operation to complete
-            result = poller.result()
-            logger.info("Document analysis completed successfully")
-            
-            # Extract all text content
-            extracted_text = self._extract_text_from_result(result)
-            
-            if not extracted_text.strip():
+            result = self.extract_from_bytes(self.read_image_bytes(image_file), image, keep_text)
+            if result is None:
                 st.warning("No text was extracted from the image. Please try with a clearer image.")
-                return None
-            
-            # Parse the extracted text for expiry dates and product info
-            parsed_info = self._parse_product_information(extracted_text)
-            
-            return parsed_info
+            return result
             
+        except ImageTooLargeError as e:
+            st.error(str(e))
+            return None
         except ResourceNotFoundError as e:
             logger.error(f"Azure resource not found: {e}")
             st.error("Azure Document Intelligence resource not found. Please check your endpoint.")
@@ -106,6 +126,10 @@ class AzureDocumentIntelligenceOCR:
             st.error("Authentication failed. Please check your Azure credentials.")
             return None
         except AzureError as e:
+            if is_throttled(e):
+                logger.warning(f"Azure OCR still throttled after retries: {e}")
+                st.warning("The OCR service is busy right now. Please try again in a minute.")
+                return None
             logger.error(f"Azure service error: {e}")
             st.error(f"Azure service error: {str(e)}")
             return None
@@ -114,79 +138,189 @@ class AzureDocumentIntelligenceOCR:
             st.error(f"Error during OCR processing: {str(e)}")
             return None
 
-    def _extract_text_from_result(self, result) -> str:
+    def extract_expiry_dates_batch(self, image_files, max_workers: Optional[int] = None) -> List[Optional[OCRResult]]:
         """
-        Extract text from Azure Document Intelligence result
+        Extract expiry dates from many images, analyzing them concurrently
+        
+        Every cache miss gets its own begin_analyze_document call on a bounded
+        thread pool, so N labels take roughly as long as the slowest one.
+        Duplicate images in the batch are only analyzed once.
         
         Args:
-            result: Azure Document Intelligence analysis result
-            
+            image_files: Iterable of uploaded files, file-like objects or bytes
+            max_workers (int): Concurrent Azure requests, defaults to OCR_MAX_WORKERS
+        
         Returns:
-            str: Extracted text content
+            list: OCRResult (or None) for each image, in input order
         """
-        extracted_text = ""
+        image_bytes_list = [self.read_image_bytes(f) for f in image_files]
+        if not self.engine.available():
+            st.error(f"❌ {NO_OCR_ENGINE_MESSAGE}")
+            return [None] * len(image_bytes_list)
         
-        if result.pages:
-            for page in result.pages:
-                if page.lines:
-                    for line in page.lines:
-                        extracted_text += line.content + "\n"
+        lookups = []
+        pending = {}
+        for image_bytes in image_bytes_list:
+            try:
+                lookup = self.lookup_label(image_bytes)
+            except ImageTooLargeError as e:
+                logger.warning(f"Batch OCR skipped an image: {e}")
+                lookups.append(None)
+                continue
+            lookups.append(lookup)
+            if lookup.result is None and lookup.text is None:
+                pending.setdefault(lookup.key, image_bytes)
+        
+        texts = {}
+        failures = 0
+        if pending:
+            # Worker threads must not touch Streamlit; errors are reported below
+            with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+                futures = {executor.submit(self._analyze_image, b): key for key, b in pending.items()}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        texts[key] = future.result()
+                    except Exception as e:
+                        logger.error(f"Batch OCR failed for image {key[:12]}: {e}")
+                        failures += 1
+        
+        if failures:
+            st.error(f"OCR failed for {failures} of {len(pending)} image(s). Please try again.")
         
-        return extracted_text
+        parsed = {}
+        results = []
+        for lookup in lookups:
+            if lookup is None:
+                results.append(None)
+                continue
+            if lookup.key not in parsed:
+                text = lookup.text if lookup.text is not None else texts.get(lookup.key)
+                if lookup.result is not None:
+                    parsed[lookup.key] = lookup.result
+                else:
+                    parsed[lookup.key] = self.finish_label(lookup, text) if text is not None else None
+            results.append(parsed[lookup.key])
+        
+        return results
 
-    def _parse_product_information(self, text: str) -> Dict[str, Any]:
+    def extract_from_bytes(self, image_bytes: bytes, image=None, keep_text: bool = False) -> Optional[OCRResult]:
         """
-        Parse extracted text to find expiry dates, product names, and other relevant information
+        Read one label: OCR cache, then the engines, then the parser, caching what was learned
+
+        This is the whole flow behind extract_expiry_date, without the Streamlit
+        messages, for callers outside the page (batch jobs, the async service).
         
         Args:
-            text (str): Raw text extracted from OCR
+            image_bytes (bytes): Raw image content
+            image: The same image already decoded with PIL, reused for preprocessing
+            keep_text (bool): Keep the full OCR text on the result as raw_text
         
         Returns:
-            dict: Parsed product information
+            OCRResult or None: None if no text was found on the label
+        
+        Raises:
+            ImageTooLargeError: If the image is over MAX_IMAGE_BYTES
+        """
+        lookup = self.lookup_label(image_bytes, keep_text)
+        if lookup.result is not None:
+            logger.info("OCR cache hit for parsed result")
+            return lookup.result
+        text = lookup.text if lookup.text is not None else self._analyze_image(image_bytes, image)
+        return self.finish_label(lookup, text, keep_text)
+
+    def lookup_label(self, image_bytes: bytes, keep_text: bool = False) -> LabelLookup:
         """
-        result = {
-            'expiry_date': None,
-            'product_name': None,
-            'manufacturer': None,
-            'batch_number': None,
-            'raw_text': text,
-            'confidence': None
-        }
+        First step of extract_from_bytes: size check and OCR cache lookup
+
+        Callers that read the text themselves (the async service awaits Azure)
+        pass the lookup and the text on to finish_label.
         
-        # Enhanced expiry date patterns with more variations
-        expiry_patterns = [
-            r'(?:exp|expiry|expires|best\s+before|use\s+by|bb|best\s+by)\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'(?:exp|expiry|expires|best\s+before|use\s+by|bb|best\s+by)\s*:?\s*(\d{1,2}\s+\w{3,9}\s+\d{2,4})',
-            r'(?:exp|expiry|expires)\s*:?\s*(\d{1,2}\.\d{1,2}\.\d{2,4})',
-            r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'(\d{2,4}[/-]\d{1,2}[/-]\d{1,2})',
-            r'(\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w*\s+\d{2,4})',
-            r'(\d{1,2}\.\d{1,2}\.\d{2,4})'
-        ]
+        Raises:
+            ImageTooLargeError: If the image is over MAX_IMAGE_BYTES
+        """
+        if len(image_bytes) > MAX_IMAGE_BYTES:
+            raise ImageTooLargeError(
+                f"File size too large. Please use an image smaller than {MAX_IMAGE_BYTES // (1024 * 1024)}MB.")
+        key = self.cache.key_for(image_bytes)
+        cached = self.cache.get(key)
+        return LabelLookup(key, self._result_from_cache(cached, keep_text), cached["text"] if cached else None)
+
+    def finish_label(self, lookup: LabelLookup, text: str, keep_text: bool = False) -> Optional[OCRResult]:
+        """Last step of extract_from_bytes: cache the text, parse it and cache the parse"""
+        if lookup.text is None:
+            self.cache.set(lookup.key, text)
+        if not text.strip():
+            return None
+        result = self._parse_product_information(text, keep_text)
+        self.cache.set(lookup.key, text, result.to_dict())
+        return result
+
+    def read_image_bytes(self, image_file) -> bytes:
+        """Read raw bytes from an uploaded file, file-like object or bytes"""
+        # Reset file pointer if needed
+        if hasattr(image_file, 'seek'):
+            image_file.seek(0)
         
-        # Search for expiry dates with priority to patterns with keywords
-        for i, pattern in enumerate(expiry_patterns):
-            matches = re.finditer(pattern, text.lower())
-            for match in matches:
-                date_str = match.group(1)
-                parsed_date = self._parse_date_string(date_str)
-                if parsed_date:
-                    result['expiry_date'] = parsed_date
-                    result['confidence'] = 'high' if i < 3 else 'medium'  # Higher confidence for keyword-based patterns
-                    break
-            if result['expiry_date']:
-                break
+        if hasattr(image_file, 'read'):
+            return image_file.read()
+        return image_file
+
+    def _analyze_image(self, image_bytes: bytes, image=None) -> str:
+        """
+        Read the text off an image with the configured OCR engines
         
-        # Extract product name with improved logic
-        result['product_name'] = self._extract_product_name(text)
+        Args:
+            image_bytes (bytes): Raw image content
+            image: The same image already decoded with PIL, if the caller has it
         
-        # Extract manufacturer/brand
-        result['manufacturer'] = self._extract_manufacturer(text)
+        Returns:
+            str: Extracted text content
+        """
+        logger.info("Starting document analysis")
+        ocr_text = self.engine.analyze(image_bytes, image)
+        logger.info(f"Document analysis completed by {ocr_text.engine}")
+        return ocr_text.text
+
+    def _extract_text_from_result(self, result) -> str:
+        """
+        Extract text from Azure Document Intelligence result
+        
+        Args:
+            result: Azure Document Intelligence analysis result
+            
+        Returns:
+            str: Extracted text content
+        """
+        return text_from_read_result(result)
+
+    def _parse_product_information(self, text: str, keep_text: bool = False) -> OCRResult:
+        """
+        Parse extracted text to find expiry dates, product names, and other relevant information
         
-        # Extract batch number
-        result['batch_number'] = self._extract_batch_number(text)
+        Args:
+            text (str): Raw text extracted from OCR
+            keep_text (bool): Keep the text on the result as raw_text
         
-        return result
+        Returns:
+            OCRResult: Parsed product information
+        """
+        return OCRResult(
+            # Single lowercase pass over a precompiled alternation (see dates.py)
+            candidates=find_date_candidates(text),
+            product_name=self._extract_product_name(text),
+            manufacturer=self._extract_manufacturer(text),
+            batch_number=self._extract_batch_number(text),
+            lines=line_spans(text),
+            raw_text=text if keep_text else None
+        )
+
+    def _result_from_cache(self, cached: Optional[Dict[str, Any]], keep_text: bool = False) -> Optional[OCRResult]:
+        """Rebuild a cached parse; entries cached before OCRResult existed are parsed again"""
+        parsed = cached["parsed"] if cached else None
+        if not parsed or "candidates" not in parsed:
+            return None
+        return OCRResult.from_dict(parsed, cached["text"] if keep_text else None)
 
     def _extract_product_name(self, text: str) -> Optional[str]:
         """Extract product name from text"""
@@ -246,35 +380,7 @@ class AzureDocumentIntelligenceOCR:
         Returns:
             datetime or None: Parsed date object
         """
-        date_formats = [
-            '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d',
-            '%d-%m-%Y', '%m-%d-%Y', '%Y-%m-%d',
-            '%d.%m.%Y', '%m.%d.%Y', '%Y.%m.%d',
-            '%d/%m/%y', '%m/%d/%y', '%y/%m/%d',
-            '%d-%m-%y', '%m-%d-%y', '%y-%m-%d',
-            '%d.%m.%y', '%m.%d.%y', '%y.%m.%d',
-            '%d %b %Y', '%d %B %Y',
-            '%b %d %Y', '%B %d %Y',
-            '%d %b %y', '%d %B %y',
-            '%b %d %y', '%B %d %y'
-        ]
-        
-        date_str = date_str.strip()
-        
-        for fmt in date_formats:
-            try:
-                parsed_date = datetime.strptime(date_str, fmt)
-                # Handle 2-digit years
-                if parsed_date.year < 1950:
-                    if parsed_date.year < 30:
-                        parsed_date = parsed_date.replace(year=parsed_date.year + 2000)
-                    else:
-                        parsed_date = parsed_date.replace(year=parsed_date.year + 1900)
-                return parsed_date
-            except ValueError:
-                continue
-        
-        return None
+        return parse_date_string(date_str)
 
     def extract_text_only(self, image_file) -> str:
         """
@@ -286,36 +392,52 @@ class AzureDocumentIntelligenceOCR:
         Returns:
             str: Raw extracted text
         """
-        if not self.client:
-            return "Azure Document Intelligence client not initialized"
+        if not self.engine.available():
+            return NO_OCR_ENGINE_MESSAGE
             
         try:
-            if hasattr(image_file, 'seek'):
-                image_file.seek(0)
+            image_bytes = self.read_image_bytes(image_file)
             
-            image_bytes = image_file.read()
+            cache_key = self.cache.key_for(image_bytes)
+            cached = self.cache.get(cache_key)
+            if cached:
+                return cached["text"]
             
-            poller = self.client.begin_analyze_document(
-                "prebuilt-read",
-                analyze_request=image_bytes,
-                content_type="application/octet-stream"
-            )
-            
-            result = poller.result()
-            return self._extract_text_from_result(result)
+            extracted_text = self._analyze_image(image_bytes)
+            self.cache.set(cache_key, extracted_text)
+            return extracted_text
             
         except Exception as e:
             logger.error(f"Error in text extraction: {e}")
             return f"Error: {str(e)}"
 
-# Initialize the OCR service
-ocr_service = AzureDocumentIntelligenceOCR()
+# The shared OCR service is created on first use, not at import
+_ocr_service = None
+_ocr_service_lock = threading.Lock()
+
+def get_ocr_service() -> AzureDocumentIntelligenceOCR:
+    """Return the process-wide OCR service, creating it on first call"""
+    global _ocr_service
+    with _ocr_service_lock:
+        if _ocr_service is None:
+            _ocr_service = AzureDocumentIntelligenceOCR()
+        return _ocr_service
+
+def __getattr__(name):
+    # Keeps `from ocr import ocr_service` working without building it at import
+    if name == "ocr_service":
+        return get_ocr_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Backward compatibility functions
 def extract_expiry_date(image_file):
     """Backward compatibility wrapper"""
-    return ocr_service.extract_expiry_date(image_file)
+    return get_ocr_service().extract_expiry_date(image_file)
+
+def extract_expiry_dates_batch(image_files, max_workers=None):
+    """Analyze several label images concurrently"""
+    return get_ocr_service().extract_expiry_dates_batch(image_files, max_workers)
 
 def extract_text_only(image_file):
     """Backward compatibility wrapper"""
-    return ocr_service.extract_text_only(image_file)
\ No newline at end of file
+    return get_ocr_service().extract_text_only(image_file)
\ No newline at end of file
@@ -0,0 +1,186 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional
+from ocr import AzureDocumentIntelligenceOCR, get_ocr_service
+from ocr_preprocess import preprocess_for_ocr
+from ocr_result import OCRResult
+from ocr_engines import NO_OCR_ENGINE_MESSAGE, expiry_confidence
+from ocr_throttle import get_azure_throttle
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDocumentIntelligenceOCR:
+    """
+    asyncio flavour of AzureDocumentIntelligenceOCR
+
+    Analysis runs on the async DocumentIntelligenceClient inside a dedicated
+    background event loop, so callers (the Streamlit script thread) only get a
+    Future back and never block on the Azure round trip. Parsing and the OCR
+    cache are shared with the synchronous service.
+    """
+
+    def __init__(self, parser: Optional[AzureDocumentIntelligenceOCR] = None,
+                 endpoint: Optional[str] = None, key: Optional[str] = None,
+                 polling_interval: Optional[float] = None, timeout: Optional[float] = None):
+        self.parser = parser or get_ocr_service()
+        self.cache = self.parser.cache
+        self.endpoint = endpoint or os.getenv("AZURE_DOC_INTELLIGENCE_ENDPOINT")
+        self.key = key or os.getenv("AZURE_DOC_INTELLIGENCE_KEY")
+        self.polling_interval = polling_interval if polling_interval is not None else float(
+            os.getenv("OCR_POLLING_INTERVAL", 1.0))
+        self.timeout = timeout if timeout is not None else float(os.getenv("OCR_TIMEOUT_SECONDS", 60.0))
+        self._client = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.endpoint and self.key)
+
+    def _get_client(self):
+        # Created lazily so the aiohttp session binds to the background loop
+        if self._client is None:
+            from azure.ai.documentintelligence.aio import DocumentIntelligenceClient as AsyncDocumentIntelligenceClient
+            from azure.core.credentials import AzureKeyCredential
+            self._client = AsyncDocumentIntelligenceClient(
+                endpoint=self.endpoint,
+                credential=AzureKeyCredential(self.key),
+                # Throttled responses are retried by ocr_throttle, shared with the sync service
+                retry_status=0
+            )
+        return self._client
+
+    async def analyze(self, image_bytes: bytes, timeout: Optional[float] = None, image=None) -> str:
+        """
+        Run prebuilt-read on an image and return its text
+
+        Args:
+            image_bytes (bytes): Raw image content
+            timeout (float): Seconds before the analysis is cancelled
+            image: The same image already decoded with PIL, reused for preprocessing
+
+        Returns:
+            str: Extracted text content
+
+        Raises:
+            asyncio.TimeoutError: If Azure does not answer within the timeout
+        """
+        async def _run():
+            # Pillow work runs off the event loop so other analyses keep polling
+            payload = await asyncio.get_running_loop().run_in_executor(
+                None, preprocess_for_ocr, image_bytes, image)
+            return await get_azure_throttle().call_async(self._read, payload)
+
+        result = await asyncio.wait_for(_run(), timeout=timeout or self.timeout)
+        return self.parser._extract_text_from_result(result)
+
+    async def _read(self, payload: bytes):
+        # Positional: the keyword is analyze_request in the betas and body in the 1.0 SDK
+        poller = await self._get_client().begin_analyze_document(
+            "prebuilt-read",
+            payload,
+            content_type="application/octet-stream",
+            polling_interval=self.polling_interval
+        )
+        return await poller.result()
+
+    async def read_text(self, image_bytes: bytes, timeout: Optional[float] = None, image=None) -> str:
+        """
+        Read an image with the parser's engines: local first, async Azure when that is not confident enough
+
+        Mirrors ocr_engines.OCRRouter, with the Azure leg on the async client.
+        """
+        router = self.parser.engine
+        use_azure = router.remote is not None and self.configured
+        if router.local_available:
+            loop = asyncio.get_running_loop()
+            try:
+                local_text = await asyncio.wait_for(
+                    loop.run_in_executor(None, router.local.analyze, image_bytes), timeout or self.timeout)
+            except Exception as e:
+                if not use_azure:
+                    raise
+                logger.warning(f"Local OCR failed, falling back to Azure: {e}")
+                local_text = None
+            if local_text is not None and (not use_azure or expiry_confidence(local_text) >= router.min_confidence):
+                return local_text.text
+        if not use_azure:
+            raise RuntimeError(NO_OCR_ENGINE_MESSAGE)
+        logger.info("Starting async document analysis with Azure Document Intelligence")
+        return await self.analyze(image_bytes, timeout, image)
+
+    async def extract_expiry_date(self, image_bytes: bytes, timeout: Optional[float] = None,
+                                  image=None) -> Optional[OCRResult]:
+        """
+        Extract expiry date and product information, using the shared cache
+
+        The parser's lookup_label and finish_label steps, as in its
+        extract_from_bytes, with the text read on the async client in between.
+
+        Returns:
+            OCRResult or None: Same as AzureDocumentIntelligenceOCR.extract_from_bytes
+
+        Raises:
+            ImageTooLargeError: If the image is over ocr.MAX_IMAGE_BYTES
+        """
+        lookup = self.parser.lookup_label(image_bytes)
+        if lookup.result is not None:
+            return lookup.result
+        text = lookup.text if lookup.text is not None else await self.read_text(image_bytes, timeout, image)
+        return self.parser.finish_label(lookup, text)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="ocr-async-loop", daemon=True).start()
+            return self._loop
+
+    def submit(self, image_file, timeout: Optional[float] = None, image=None) -> Future:
+        """
+        Start extract_expiry_date in the background and return immediately
+
+        The returned concurrent.futures.Future resolves to the parsed result.
+        Calling future.cancel() cancels the in-flight Azure request. Pass the
+        PIL image if the caller already decoded it (it must be fully loaded,
+        since it is read from the background thread).
+        """
+        if not (self.configured or self.parser.engine.local_available):
+            raise RuntimeError(NO_OCR_ENGINE_MESSAGE)
+        image_bytes = self.parser.read_image_bytes(image_file)
+        return asyncio.run_coroutine_threadsafe(
+            self.extract_expiry_date(image_bytes, timeout, image), self._get_loop()
+        )
+
+    def close(self):
+        """Close the async client and stop the background loop"""
+        with self._loop_lock:
+            if self._loop is None:
+                return
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+                self._client = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+
+# Shared async OCR service, created on first use
+_async_ocr_service = None
+_async_ocr_service_lock = threading.Lock()
+
+
+def get_async_ocr_service() -> AsyncDocumentIntelligenceOCR:
+    global _async_ocr_service
+    with _async_ocr_service_lock:
+        if _async_ocr_service is None:
+            _async_ocr_service = AsyncDocumentIntelligenceOCR()
+        return _async_ocr_service
+
+
+def submit_expiry_date_extraction(image_file, timeout=None, image=None):
+    """Start a non-blocking expiry date extraction; returns a Future"""
+    return get_async_ocr_service().submit(image_file, timeout, image)
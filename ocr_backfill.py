@@ -0,0 +1,268 @@
+"""
+Bulk OCR backfill for label photos
+
+Runs OCR over a directory or CSV manifest of label images outside the
+Streamlit app and inserts one product per detected expiry date:
+    python ocr_backfill.py photos/ --user-email store@example.com
+    python ocr_backfill.py manifest.csv --user-email store@example.com --concurrency 8
+
+A manifest has a "path" column (relative to the manifest) and optional "name"
+and "user_email" columns. Progress is appended to a checkpoint file, so an
+interrupted run picks up where it stopped when started again.
+"""
+import os
+import csv
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+from ocr_engines import NO_OCR_ENGINE_MESSAGE
+from ocr_throttle import get_azure_throttle
+
+# --- CONFIG ---
+BACKFILL_CONCURRENCY = int(os.getenv("OCR_BACKFILL_CONCURRENCY", 4))
+BACKFILL_BATCH_SIZE = int(os.getenv("OCR_BACKFILL_BATCH_SIZE", 100))
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+DEFAULT_CHECKPOINT = "ocr_backfill.checkpoint.jsonl"
+
+# Checkpoint statuses that are not processed again on resume; failures are retried
+FINISHED_STATUSES = {"inserted", "duplicate", "no_date"}
+
+
+class LabelImage(NamedTuple):
+    path: Path
+    name: Optional[str]
+    user_email: str
+
+
+# --- INPUTS ---
+def iter_directory(directory: str, user_email: str) -> Iterator[LabelImage]:
+    """Every image under a directory, in a stable order"""
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix.lower() in IMAGE_EXTENSIONS and path.is_file():
+            yield LabelImage(path, None, user_email)
+
+
+def iter_manifest(manifest: str, user_email: Optional[str]) -> Iterator[LabelImage]:
+    """Rows of a CSV manifest; paths are relative to the manifest's directory"""
+    base = Path(manifest).parent
+    with open(manifest, newline="", encoding="utf-8-sig") as f:
+        for line_no, row in enumerate(csv.DictReader(f), 2):
+            owner = (row.get("user_email") or "").strip() or user_email
+            if not owner:
+                raise ValueError(f"{manifest}:{line_no} has no user_email and --user-email was not given")
+            yield LabelImage(base / row["path"].strip(), (row.get("name") or "").strip() or None, owner)
+
+
+# --- CHECKPOINT ---
+class Checkpoint:
+    """Append-only JSON lines log of processed images, one line per image"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.finished: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a torn last line from an interrupted run
+                    if entry.get("status") in FINISHED_STATUSES:
+                        self.finished.add(entry["path"])
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, label: LabelImage, status: str, **details):
+        with self._lock:
+            self._file.write(json.dumps({"path": str(label.path), "status": status, **details}) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# --- OCR ---
+def read_label(service, label: LabelImage):
+    """
+    (cache key, OCRResult or None) for one image; the OCR cache is used like in the app
+
+    Throttled Azure requests are retried by the process-wide throttle in
+    ocr_throttle.py, which also caps how many run at once.
+    """
+    with open(label.path, "rb") as f:
+        image_bytes = f.read()
+    return service.cache.key_for(image_bytes), service.extract_from_bytes(image_bytes)
+
+
+def product_document(label: LabelImage, key: str, result) -> Dict[str, Any]:
+    """The products document for a label; the manifest name wins over the OCR guess"""
+    return {
+        "user_email": label.user_email,
+        "name": label.name or result.product_name or label.path.stem,
+        "expiry": result.expiry_date,
+        "is_deleted": False,
+        # Content hash of the photo; a unique index makes re-inserting it a no-op
+        "ocr_source": key,
+    }
+
+
+# --- INSERT ---
+def insert_batch(collection, batch: List[tuple], checkpoint: Checkpoint, stats: Dict[str, Any]):
+    """
+    insert_many one batch of (label, document) with ordered=False
+
+    Duplicate-key errors mean the photo was already inserted by an earlier,
+    interrupted run and count as done; other write errors are checkpointed as
+    failures and retried on the next run.
+    """
+    from pymongo.errors import BulkWriteError
+
+    if not batch:
+        return
+    errors = {}
+    try:
+        collection.insert_many([document for _, document in batch], ordered=False)
+    except BulkWriteError as e:
+        errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+    for index, (label, document) in enumerate(batch):
+        error = errors.get(index)
+        if error is None:
+            stats["inserted"] += 1
+            checkpoint.record(label, "inserted", product_id=str(document["_id"]))
+        elif error.get("code") == 11000:
+            stats["duplicate"] += 1
+            checkpoint.record(label, "duplicate")
+        else:
+            stats["failed"] += 1
+            checkpoint.record(label, "failed", error=error.get("errmsg"))
+            print(f"❌ Insert failed for {label.path}: {error.get('errmsg')}")
+    batch.clear()
+
+
+# --- PIPELINE ---
+def run_backfill(labels: Iterable[LabelImage], collection, checkpoint: Checkpoint, service=None,
+                 concurrency: int = BACKFILL_CONCURRENCY, batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    OCR every label not yet in the checkpoint and insert the detected products
+
+    At most 2 * concurrency images are read and analyzed at a time, so memory
+    does not grow with the size of the backlog. Products are inserted from the
+    main thread in batches of batch_size.
+
+    Returns:
+        dict: Counts per outcome, throttled retries and elapsed seconds
+    """
+    if service is None:
+        from ocr import get_ocr_service
+        service = get_ocr_service()
+    if not service.engine.available():
+        raise RuntimeError(NO_OCR_ENGINE_MESSAGE)
+
+    stats = {"processed": 0, "skipped": 0, "inserted": 0, "duplicate": 0, "no_date": 0, "failed": 0,
+             "throttled": 0}
+    throttle = get_azure_throttle()
+    retries_before = throttle.snapshot()["retries"]
+    batch = []
+    started = time.perf_counter()
+
+    def collect(done):
+        for future in done:
+            label = futures.pop(future)
+            stats["processed"] += 1
+            try:
+                key, result = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                checkpoint.record(label, "failed", error=str(e))
+                print(f"❌ OCR failed for {label.path}: {e}")
+                continue
+            if result is None or result.expiry_date is None:
+                stats["no_date"] += 1
+                checkpoint.record(label, "no_date", key=key)
+                print(f"⚠ No expiry date detected in {label.path}")
+                continue
+            batch.append((label, product_document(label, key, result)))
+            if len(batch) >= batch_size:
+                insert_batch(collection, batch, checkpoint, stats)
+
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for label in labels:
+            if str(label.path) in checkpoint.finished:
+                stats["skipped"] += 1
+                continue
+            if len(futures) >= 2 * concurrency:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+            futures[executor.submit(read_label, service, label)] = label
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            collect(done)
+    insert_batch(collection, batch, checkpoint, stats)
+
+    stats["throttled"] = throttle.snapshot()["retries"] - retries_before
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def print_report(stats: Dict[str, Any]):
+    elapsed = stats["elapsed"]
+    rate = stats["processed"] / elapsed if elapsed > 0 else 0.0
+    print(f"📦 Processed {stats['processed']} image(s) in {elapsed:.1f}s ({rate:.2f} images/sec)")
+    print(f"✅ Inserted {stats['inserted']} product(s)"
+          + (f", {stats['duplicate']} already present" if stats["duplicate"] else ""))
+    if stats["skipped"]:
+        print(f"⏭ Skipped {stats['skipped']} image(s) finished in an earlier run")
+    if stats["no_date"]:
+        print(f"⚠ No expiry date in {stats['no_date']} image(s)")
+    if stats["throttled"]:
+        print(f"🐢 Retried {stats['throttled']} throttled request(s)")
+    if stats["failed"]:
+        print(f"❌ {stats['failed']} image(s) failed; run again to retry them")
+
+
+# --- MAIN ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="directory of label images or CSV manifest")
+    parser.add_argument("--user-email", help="owner of the products (manifest rows may set their own)")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY, help="images analyzed at once")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="products per insert_many")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="progress file used to resume")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.source):
+        if not args.user_email:
+            parser.error("--user-email is required for a directory")
+        labels = iter_directory(args.source, args.user_email)
+    else:
+        labels = iter_manifest(args.source, args.user_email)
+
+    from db import get_db
+    from indexes import ensure_indexes
+
+    db = get_db()
+    # Includes the unique ocr_source index that makes resumed inserts idempotent
+    ensure_indexes(db)
+
+    checkpoint = Checkpoint(args.checkpoint)
+    print(f"🚀 Starting OCR backfill of {args.source} at {datetime.now():%Y-%m-%d %H:%M:%S}")
+    try:
+        stats = run_backfill(labels, db["products"], checkpoint, concurrency=args.concurrency,
+                             batch_size=args.batch_size)
+    finally:
+        checkpoint.close()
+    print_report(stats)
+    return stats
+
+
+if __name__ == "__main__":
+    main()
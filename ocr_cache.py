@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value):
+    """JSON hook for the datetimes inside parsed OCR results"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class OCRCache:
+    """
+    Content-addressed cache for OCR results
+
+    Entries are keyed by the SHA-256 of the image bytes and hold the extracted
+    text plus (optionally) the parsed product information. Lookups hit an
+    in-memory LRU first and fall back to an optional SQLite file that is
+    trimmed by age (TTL) and entry count.
+    """
+
+    def __init__(self, max_entries: int = 128, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 5000, ttl_seconds: float = 30 * 24 * 60 * 60):
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if disk_path:
+            try:
+                self._db = sqlite3.connect(disk_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                    "key TEXT PRIMARY KEY, text TEXT NOT NULL, parsed TEXT, "
+                    "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"OCR disk cache disabled, could not open {disk_path}: {e}")
+                self._db = None
+
+    @classmethod
+    def from_env(cls) -> "OCRCache":
+        """Build a cache from OCR_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv("OCR_CACHE_SIZE", 128)),
+            disk_path=os.getenv("OCR_CACHE_PATH") or None,
+            disk_max_entries=int(os.getenv("OCR_CACHE_DISK_MAX_ENTRIES", 5000)),
+            ttl_seconds=float(os.getenv("OCR_CACHE_TTL_SECONDS", 30 * 24 * 60 * 60))
+        )
+
+    @staticmethod
+    def key_for(image_bytes: bytes) -> str:
+        """Hash image bytes into a cache key"""
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached OCR result
+
+        Returns:
+            dict or None: {"text": str, "parsed": dict or None}
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if time.time() - entry["created_at"] <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    return entry
+                del self._memory[key]
+
+            entry = self._disk_get(key)
+            if entry is not None:
+                self._memory_put(key, entry)
+            return entry
+
+    def set(self, key: str, text: str, parsed: Optional[Dict[str, Any]] = None):
+        """Store extracted text and, if available, the parsed result"""
+        with self._lock:
+            if parsed is None and key in self._memory:
+                parsed = self._memory[key]["parsed"]
+            entry = {"text": text, "parsed": parsed, "created_at": time.time()}
+            self._memory_put(key, entry)
+            self._disk_put(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM ocr_cache")
+                self._db.commit()
+
+    def _memory_put(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT text, parsed, created_at FROM ocr_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE ocr_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            text, parsed, created_at = row
+            return {
+                "text": text,
+                "parsed": json.loads(parsed, object_hook=_decode) if parsed else None,
+                "created_at": created_at
+            }
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"OCR disk cache read failed: {e}")
+            return None
+
+    def _disk_put(self, key: str, entry: Dict[str, Any]):
+        if self._db is None:
+            return
+        try:
+            parsed = json.dumps(entry["parsed"], default=_encode) if entry["parsed"] is not None else None
+            self._db.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, text, parsed, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, entry["text"], parsed, entry["created_at"], entry["created_at"])
+            )
+            # Evict expired rows, then the least recently used beyond the size cap
+            self._db.execute("DELETE FROM ocr_cache WHERE created_at < ?",
+                             (time.time() - self.ttl_seconds,))
+            self._db.execute(
+                "DELETE FROM ocr_cache WHERE key IN ("
+                "SELECT key FROM ocr_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.disk_max_entries,)
+            )
+            self._db.commit()
+        except (sqlite3.Error, TypeError) as e:
+            logger.error(f"OCR disk cache write failed: {e}")
@@ -0,0 +1,272 @@
+"""
+OCR engines behind one interface
+
+AzureReadEngine sends the label to Azure Document Intelligence (prebuilt-read).
+TesseractEngine reads it locally with Tesseract in a process pool, so it needs
+no network or credentials. OCRRouter tries the local engine first and falls
+back to Azure when the local read is not confident enough.
+"""
+import io
+import os
+import logging
+from abc import ABC, abstractmethod
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, NamedTuple, Optional, Tuple
+from dates import best_expiry_candidate, find_date_candidates
+from ocr_preprocess import OCR_MAX_DIMENSION, preprocess_for_ocr
+from ocr_throttle import AzureThrottle, get_azure_throttle
+
+logger = logging.getLogger(__name__)
+
+# "local-first" (default), "azure" or "tesseract"
+OCR_ENGINE = os.getenv("OCR_ENGINE", "local-first").lower()
+
+# Local reads scoring below this (0-1) are sent to Azure as well
+OCR_LOCAL_MIN_CONFIDENCE = float(os.getenv("OCR_LOCAL_MIN_CONFIDENCE", 0.6))
+
+OCR_TESSERACT_WORKERS = int(os.getenv("OCR_TESSERACT_WORKERS", os.cpu_count() or 2))
+OCR_TESSERACT_LANG = os.getenv("OCR_TESSERACT_LANG", "eng")
+OCR_TESSERACT_CONFIG = os.getenv("OCR_TESSERACT_CONFIG", "--psm 11")
+OCR_TESSERACT_TIMEOUT = float(os.getenv("OCR_TESSERACT_TIMEOUT", 30))
+
+# Shown or raised wherever a label has to be read and no engine is configured
+NO_OCR_ENGINE_MESSAGE = "No OCR engine available: configure Azure Document Intelligence or install Tesseract"
+
+
+class OCRText(NamedTuple):
+    """Text read off an image, the engine's own 0-1 confidence (None if unknown) and who read it"""
+    text: str
+    confidence: Optional[float]
+    engine: str
+
+
+def text_from_read_result(result) -> str:
+    """One line of text per OCR line in an Azure analyze result"""
+    lines = [line.content for page in result.pages or () for line in page.lines or ()]
+    return "".join(f"{line}\n" for line in lines)
+
+
+def read_result_confidence(result) -> Optional[float]:
+    """Mean word confidence of an Azure analyze result"""
+    scores = [word.confidence for page in result.pages or () for word in page.words or ()
+              if word.confidence is not None]
+    return sum(scores) / len(scores) if scores else None
+
+
+def expiry_confidence(ocr_text: OCRText) -> float:
+    """
+    How far a read can be trusted for the expiry date
+
+    The score of the best date candidate (see dates.KIND_SCORES) scaled by the
+    engine's confidence in the characters; 0 when no date was found.
+    """
+    best = best_expiry_candidate(find_date_candidates(ocr_text.text))
+    if best is None:
+        return 0.0
+    return best.score * (ocr_text.confidence if ocr_text.confidence is not None else 1.0)
+
+
+class OCREngine(ABC):
+    """Reads the text off a label image"""
+
+    name = "engine"
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def analyze(self, image_bytes: bytes, image=None) -> OCRText:
+        """
+        Args:
+            image_bytes (bytes): Raw image content
+            image: The same image already decoded with PIL, if the caller has it
+        """
+
+
+class AzureReadEngine(OCREngine):
+    """
+    Azure Document Intelligence prebuilt-read on a preprocessed payload
+
+    Requests go through the process-wide AzureThrottle, which rate limits them
+    and retries the ones Azure throttles.
+    """
+
+    name = "azure"
+
+    def __init__(self, endpoint: Optional[str], key: Optional[str], client_factory: Callable[[], object],
+                 throttle: Optional[AzureThrottle] = None):
+        self.endpoint = endpoint
+        self.key = key
+        self.throttle = throttle or get_azure_throttle()
+        self._client_factory = client_factory
+
+    def available(self) -> bool:
+        return bool(self.endpoint and self.key) and self._client_factory() is not None
+
+    def analyze(self, image_bytes: bytes, image=None) -> OCRText:
+        # Uploads an oriented, downscaled grayscale JPEG instead of the raw photo
+        payload = preprocess_for_ocr(image_bytes, image)
+        result = self.throttle.call(self._read, payload)
+        return OCRText(text_from_read_result(result), read_result_confidence(result), self.name)
+
+    def _read(self, payload: bytes):
+        # Positional: the keyword is analyze_request in the betas and body in the 1.0 SDK
+        poller = self._client_factory().begin_analyze_document(
+            "prebuilt-read",
+            payload,
+            content_type="application/octet-stream"
+        )
+        return poller.result()
+
+
+def _tesseract_read(image_bytes: bytes, lang: str, config: str, max_dimension: int) -> Tuple[str, Optional[float]]:
+    """Run Tesseract on one image; executed in a worker process"""
+    import pytesseract
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft("L", (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image).convert("L")
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    data = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+    lines = {}
+    scores = []
+    for word, conf, block, par, line in zip(data["text"], data["conf"], data["block_num"],
+                                            data["par_num"], data["line_num"]):
+        word = word.strip()
+        conf = float(conf)
+        if not word or conf < 0:
+            continue
+        # Words arrive in reading order; group them back into lines
+        lines.setdefault((block, par, line), []).append(word)
+        scores.append(conf / 100)
+    text = "".join(" ".join(words) + "\n" for words in lines.values())
+    return text, (sum(scores) / len(scores) if scores else None)
+
+
+class TesseractEngine(OCREngine):
+    """
+    Local Tesseract OCR on a process pool
+
+    Tesseract is CPU bound, so reads run in worker processes instead of
+    threads. The pool is started on first use; available() is False when
+    pytesseract or the tesseract binary is missing.
+    """
+
+    name = "tesseract"
+
+    def __init__(self, workers: int = OCR_TESSERACT_WORKERS, lang: str = OCR_TESSERACT_LANG,
+                 config: str = OCR_TESSERACT_CONFIG, timeout: float = OCR_TESSERACT_TIMEOUT):
+        self.workers = workers
+        self.lang = lang
+        self.config = config
+        self.timeout = timeout
+        self._available = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        if self._available is None:
+            try:
+                import pytesseract
+                pytesseract.get_tesseract_version()
+                self._available = True
+            except Exception as e:
+                logger.info(f"Tesseract OCR unavailable: {e}")
+                self._available = False
+        return self._available
+
+    def submit(self, image_bytes: bytes) -> Future:
+        """Start a read in the pool; the Future resolves to an OCRText"""
+        with self._lock:
+            if self._pool is None:
+                # Spawned, not forked: the app process runs Mongo and asyncio threads
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            pool_future = self._pool.submit(_tesseract_read, image_bytes, self.lang, self.config, OCR_MAX_DIMENSION)
+
+        future = Future()
+
+        def done(f):
+            if f.cancelled():
+                future.cancel()
+            elif f.exception() is not None:
+                future.set_exception(f.exception())
+            else:
+                text, confidence = f.result()
+                future.set_result(OCRText(text, confidence, self.name))
+
+        pool_future.add_done_callback(done)
+        return future
+
+    def analyze(self, image_bytes: bytes, image=None) -> OCRText:
+        # The decoded image cannot cheaply cross the process boundary; the worker decodes the bytes
+        return self.submit(image_bytes).result(timeout=self.timeout)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+class OCRRouter(OCREngine):
+    """
+    Local-first routing between a local and a remote engine
+
+    The local engine reads every label first. Its read is used when
+    expiry_confidence() reaches min_confidence (or there is no remote engine);
+    otherwise the label is sent to the remote engine. Either engine may be None.
+    """
+
+    name = "router"
+
+    def __init__(self, local: Optional[OCREngine] = None, remote: Optional[OCREngine] = None,
+                 min_confidence: float = OCR_LOCAL_MIN_CONFIDENCE):
+        self.local = local
+        self.remote = remote
+        self.min_confidence = min_confidence
+
+    @property
+    def local_available(self) -> bool:
+        return self.local is not None and self.local.available()
+
+    @property
+    def remote_available(self) -> bool:
+        return self.remote is not None and self.remote.available()
+
+    def available(self) -> bool:
+        return self.local_available or self.remote_available
+
+    def accept(self, ocr_text: Optional[OCRText]) -> bool:
+        """Whether a local read is good enough to skip the remote engine"""
+        if ocr_text is None:
+            return False
+        return not self.remote_available or expiry_confidence(ocr_text) >= self.min_confidence
+
+    def analyze(self, image_bytes: bytes, image=None) -> OCRText:
+        if self.local_available:
+            try:
+                local_text = self.local.analyze(image_bytes, image)
+            except Exception as e:
+                if not self.remote_available:
+                    raise
+                logger.warning(f"Local OCR failed, falling back to {self.remote.name}: {e}")
+                local_text = None
+            if self.accept(local_text):
+                return local_text
+            logger.info(f"Local OCR not confident enough, using {self.remote.name}")
+        if not self.remote_available:
+            raise RuntimeError(NO_OCR_ENGINE_MESSAGE)
+        return self.remote.analyze(image_bytes, image)
+
+
+def build_router(endpoint: Optional[str], key: Optional[str], client_factory: Callable[[], object],
+                 engine: str = OCR_ENGINE) -> OCRRouter:
+    """The engines selected by OCR_ENGINE, wrapped in a router"""
+    local = TesseractEngine() if engine in ("local-first", "tesseract") else None
+    remote = AzureReadEngine(endpoint, key, client_factory) if engine in ("local-first", "azure") else None
+    return OCRRouter(local, remote)
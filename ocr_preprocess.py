@@ -0,0 +1,113 @@
+import io
+import os
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Shrink label photos before they are uploaded for OCR; set to "false" to send raw bytes
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "true").lower() != "false"
+
+# Longest side, in pixels, of the image sent to Azure
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", 2000))
+
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", 85))
+
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "true").lower() != "false"
+
+# Crop to the high-contrast region around the label text; off by default
+OCR_AUTO_CROP = os.getenv("OCR_AUTO_CROP", "false").lower() == "true"
+
+# Edge strength (0-255) that counts as label content when auto-cropping
+EDGE_THRESHOLD = 48
+
+
+def crop_to_label(image, margin: float = 0.05, min_fraction: float = 0.1):
+    """
+    Crop an image to the bounding box of its strong edges, where label text is
+
+    The box is found on a small grayscale probe, padded by margin on each
+    side and scaled back up. Images whose box is implausibly small (under
+    min_fraction of the area) or already the whole frame are returned as is.
+    """
+    from PIL import ImageFilter
+
+    probe = image.convert("L")
+    probe.thumbnail((256, 256))
+    width, height = probe.size
+    if width < 8 or height < 8:
+        return image
+    edges = probe.filter(ImageFilter.FIND_EDGES).point(lambda v: 255 if v > EDGE_THRESHOLD else 0)
+    # FIND_EDGES marks the one-pixel border of every image; ignore it
+    bbox = edges.crop((1, 1, width - 1, height - 1)).getbbox()
+    if bbox is None:
+        return image
+
+    scale_x, scale_y = image.width / width, image.height / height
+    pad_x, pad_y = margin * image.width, margin * image.height
+    left = max(0, int((bbox[0] + 1) * scale_x - pad_x))
+    top = max(0, int((bbox[1] + 1) * scale_y - pad_y))
+    right = min(image.width, int((bbox[2] + 1) * scale_x + pad_x))
+    bottom = min(image.height, int((bbox[3] + 1) * scale_y + pad_y))
+
+    area = (right - left) * (bottom - top)
+    if area < min_fraction * image.width * image.height or area >= image.width * image.height:
+        return image
+    return image.crop((left, top, right, bottom))
+
+
+def preprocess_for_ocr(image_bytes: bytes, image=None, max_dimension: Optional[int] = None,
+                       grayscale: Optional[bool] = None, quality: Optional[int] = None,
+                       auto_crop: Optional[bool] = None) -> bytes:
+    """
+    Re-encode a label image into a small payload for OCR
+
+    Applies the EXIF orientation, optionally crops to the label, downscales so
+    the longest side is at most max_dimension, converts to grayscale and saves
+    as JPEG. The original bytes are returned if preprocessing is disabled,
+    fails, or would not make the payload smaller.
+
+    Args:
+        image_bytes (bytes): Raw uploaded image
+        image (PIL.Image.Image): The same image already decoded by the caller, reused instead of decoding again
+        max_dimension (int): Longest side in pixels, defaults to OCR_MAX_DIMENSION
+        grayscale (bool): Drop colour, defaults to OCR_GRAYSCALE
+        quality (int): JPEG quality, defaults to OCR_JPEG_QUALITY
+        auto_crop (bool): Crop to the label region, defaults to OCR_AUTO_CROP
+
+    Returns:
+        bytes: Image content to upload
+    """
+    if not OCR_PREPROCESS:
+        return image_bytes
+    max_dimension = max_dimension or OCR_MAX_DIMENSION
+    grayscale = OCR_GRAYSCALE if grayscale is None else grayscale
+    quality = quality or OCR_JPEG_QUALITY
+    auto_crop = OCR_AUTO_CROP if auto_crop is None else auto_crop
+
+    from PIL import Image, ImageOps
+
+    try:
+        if image is None:
+            image = Image.open(io.BytesIO(image_bytes))
+            # Let the JPEG decoder scale down while decoding instead of afterwards
+            image.draft("L" if grayscale else "RGB", (max_dimension, max_dimension))
+
+        # Returns a copy, so the caller's image (e.g. the one on screen) is left untouched
+        prepared = ImageOps.exif_transpose(image)
+        if auto_crop:
+            prepared = crop_to_label(prepared)
+        prepared.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        prepared = prepared.convert("L" if grayscale else "RGB")
+
+        output = io.BytesIO()
+        prepared.save(output, format="JPEG", quality=quality, optimize=True)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Image preprocessing skipped: {e}")
+        return image_bytes
+
+    payload = output.getvalue()
+    if len(payload) >= len(image_bytes):
+        return image_bytes
+    logger.info(f"Preprocessed image for OCR: {len(image_bytes)} -> {len(payload)} bytes")
+    return payload
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+from dates import DateCandidate, best_expiry_candidate, confidence_label
+
+
+def line_spans(text: str) -> Tuple[Tuple[int, int], ...]:
+    """(start, end) offsets of every line in OCR text, without the newlines"""
+    spans = []
+    start = 0
+    for line in text.split("\n"):
+        spans.append((start, start + len(line)))
+        start += len(line) + 1
+    # Text assembled from OCR lines ends with a newline; drop the empty tail
+    if spans and spans[-1][0] == spans[-1][1] == len(text):
+        spans.pop()
+    return tuple(spans)
+
+
+class OCRResult:
+    """
+    What was read off one label
+
+    Holds every date candidate with its score, the best of them as
+    expiry_date, the extracted product details and the (start, end) span of
+    each OCR line. The OCR text itself is only kept when asked for, so results
+    stay small when held in session state or sent through batch pipelines.
+    """
+
+    __slots__ = ("candidates", "product_name", "manufacturer", "batch_number", "lines", "raw_text", "_best")
+
+    def __init__(self, candidates: Iterable[DateCandidate] = (), product_name: Optional[str] = None,
+                 manufacturer: Optional[str] = None, batch_number: Optional[str] = None,
+                 lines: Tuple[Tuple[int, int], ...] = (), raw_text: Optional[str] = None):
+        self.candidates = tuple(candidates)
+        self.product_name = product_name
+        self.manufacturer = manufacturer
+        self.batch_number = batch_number
+        self.lines = lines
+        self.raw_text = raw_text
+        self._best = best_expiry_candidate(self.candidates)
+
+    @property
+    def best(self) -> Optional[DateCandidate]:
+        return self._best
+
+    @property
+    def expiry_date(self) -> Optional[datetime]:
+        return self._best.date if self._best else None
+
+    @property
+    def score(self) -> Optional[float]:
+        return self._best.score if self._best else None
+
+    @property
+    def confidence(self) -> Optional[str]:
+        return confidence_label(self.score)
+
+    @property
+    def alternative_dates(self) -> Tuple[datetime, ...]:
+        """Other valid readings of the expiry date's text, e.g. 5 April for 04/05/2026 read as 4 May"""
+        return self._best.alternatives if self._best else ()
+
+    def line_of(self, candidate: DateCandidate) -> Optional[int]:
+        """Index of the OCR line a candidate was found on"""
+        for i, (start, end) in enumerate(self.lines):
+            if start <= candidate.start <= end:
+                return i
+        return None
+
+    def with_text(self, raw_text: Optional[str]) -> "OCRResult":
+        """A copy carrying (or dropping) the OCR text"""
+        return OCRResult(self.candidates, self.product_name, self.manufacturer, self.batch_number,
+                         self.lines, raw_text)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-type form for the OCR cache and other serializers; the text is never included"""
+        return {
+            "candidates": [list(c) for c in self.candidates],
+            "product_name": self.product_name,
+            "manufacturer": self.manufacturer,
+            "batch_number": self.batch_number,
+            "lines": [list(span) for span in self.lines],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], raw_text: Optional[str] = None) -> "OCRResult":
+        return cls(
+            # Entries cached before alternatives existed have six fields
+            candidates=[DateCandidate(*c[:6], tuple(c[6]) if len(c) > 6 else ()) for c in data.get("candidates", ())],
+            product_name=data.get("product_name"),
+            manufacturer=data.get("manufacturer"),
+            batch_number=data.get("batch_number"),
+            lines=tuple(tuple(span) for span in data.get("lines", ())),
+            raw_text=raw_text,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, OCRResult):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (f"OCRResult(expiry_date={self.expiry_date!r}, confidence={self.confidence!r}, "
+                f"product_name={self.product_name!r}, candidates={len(self.candidates)})")
@@ -0,0 +1,259 @@
+"""
+Throttling for Azure Document Intelligence requests
+
+Every Azure OCR call in the process (the sync and async services, batch
+extraction and ocr_backfill.py) goes through one AzureThrottle:
+
+- a token bucket sized to the resource tier's transactions per second
+- a cap on analyses in flight at once
+- retries of throttled (429/503) responses with jittered exponential backoff
+  that honours Retry-After, and pauses the bucket for every caller
+- a retry budget that keeps retries to a fraction of traffic, so an outage
+  does not turn into a retry storm
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Analyze requests per second allowed by the Document Intelligence tier (S0: 15, F0: about 0.33)
+OCR_AZURE_TPS = float(os.getenv("OCR_AZURE_TPS", 15))
+
+# Requests that may be sent back to back after an idle period
+OCR_AZURE_BURST = int(os.getenv("OCR_AZURE_BURST", max(1, int(OCR_AZURE_TPS))))
+
+# Analyses in flight at once across all threads and the async loop
+OCR_AZURE_MAX_CONCURRENCY = int(os.getenv("OCR_AZURE_MAX_CONCURRENCY", 8))
+
+OCR_AZURE_MAX_RETRIES = int(os.getenv("OCR_AZURE_MAX_RETRIES", 4))
+
+# Retries allowed per request sent, on top of a small reserve
+OCR_RETRY_BUDGET_RATIO = float(os.getenv("OCR_RETRY_BUDGET_RATIO", 0.2))
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+THROTTLED_STATUSES = {429, 503}
+
+# How often an async caller checks for a free slot
+ASYNC_SLOT_POLL_SECONDS = 0.05
+
+
+def is_throttled(error: Exception) -> bool:
+    """Whether Azure rejected a request for load (429 Too Many Requests or 503 Service Unavailable)"""
+    return getattr(error, "status_code", None) in THROTTLED_STATUSES
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The delay the service asked for in its throttling response, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("x-ms-retry-after-ms", 0.001), ("Retry-After", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return float(value) * scale
+        except ValueError:
+            continue  # an HTTP date; fall back to our own backoff
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket handing out reservations
+
+    reserve() always takes a token and returns how long the caller must wait
+    before using it, so waiting happens outside the lock and works the same
+    for threads (time.sleep) and coroutines (asyncio.sleep). A rate of 0 or
+    less disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take one token; returns the seconds to wait before sending"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def pause(self, seconds: float):
+        """Hold back every new reservation for at least seconds"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            # The next reservation waits (1 - tokens) / rate
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class RetryBudget:
+    """Each request deposits ratio of a retry and each retry withdraws one, starting from a small reserve"""
+
+    def __init__(self, ratio: float, reserve: float = 10.0):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self.reserve, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class AzureThrottle:
+    """
+    Rate limit, concurrency cap and retry policy shared by all Azure OCR callers
+
+    call() runs a blocking request function and call_async() awaits a
+    coroutine function. Both hold a concurrency slot and a bucket token for
+    each attempt, and raise the last error once retries or the retry budget
+    run out.
+    """
+
+    def __init__(self, tps: float = OCR_AZURE_TPS, burst: int = OCR_AZURE_BURST,
+                 max_concurrency: int = OCR_AZURE_MAX_CONCURRENCY, max_retries: int = OCR_AZURE_MAX_RETRIES,
+                 budget_ratio: float = OCR_RETRY_BUDGET_RATIO):
+        self.bucket = TokenBucket(tps, burst)
+        self.budget = RetryBudget(budget_ratio)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "gave_up": 0}
+        self._in_flight = 0
+        self._slots = threading.Condition()
+
+    def _try_acquire_slot(self) -> bool:
+        with self._slots:
+            if self._in_flight >= self.max_concurrency:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release_slot(self):
+        with self._slots:
+            self._in_flight -= 1
+            self._slots.notify()
+
+    @contextmanager
+    def _slot(self):
+        with self._slots:
+            self._slots.wait_for(lambda: self._in_flight < self.max_concurrency)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    @asynccontextmanager
+    async def _async_slot(self):
+        # Polled rather than waited on in an executor thread, so a cancelled caller never leaks a slot
+        while not self._try_acquire_slot():
+            await asyncio.sleep(ASYNC_SLOT_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error should be raised"""
+        if not is_throttled(error):
+            return None
+        with self._slots:
+            self.stats["throttled"] += 1
+        if attempt >= self.max_retries or not self.budget.withdraw():
+            with self._slots:
+                self.stats["gave_up"] += 1
+            logger.warning(f"Azure OCR throttled (HTTP {error.status_code}), giving up after {attempt + 1} attempt(s)")
+            return None
+
+        delay = retry_after_seconds(error)
+        if delay is None:
+            # Full jitter, so callers throttled together do not retry together
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        # The limit is per resource, so everyone else backs off too
+        self.bucket.pause(delay)
+        with self._slots:
+            self.stats["retries"] += 1
+        logger.info(f"Azure OCR throttled (HTTP {error.status_code}), retrying in {delay:.1f}s")
+        return delay
+
+    def _start_request(self):
+        self.budget.deposit()
+        with self._slots:
+            self.stats["requests"] += 1
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) under the rate limit, retrying throttled attempts"""
+        self._start_request()
+        attempt = 0
+        while True:
+            with self._slot():
+                time.sleep(self.bucket.reserve())
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await func(*args, **kwargs) under the rate limit, retrying throttled attempts"""
+        self._start_request()
+        attempt = 0
+        while True:
+            async with self._async_slot():
+                await asyncio.sleep(self.bucket.reserve())
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """A copy of the request counters"""
+        with self._slots:
+            return dict(self.stats)
+
+
+# One throttle per process: the Azure limits apply to the resource, not to a caller
+_azure_throttle = None
+_azure_throttle_lock = threading.Lock()
+
+
+def get_azure_throttle() -> AzureThrottle:
+    """Return the process-wide Azure throttle, creating it on first call"""
+    global _azure_throttle
+    with _azure_throttle_lock:
+        if _azure_throttle is None:
+            _azure_throttle = AzureThrottle()
+        return _azure_throttle
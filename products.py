@@ -0,0 +1,243 @@
+import io
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from dates import parse_date_string
+from exports import EXPORT_COLUMNS
+from utils import classify_expiry
+
+# Products are listed soonest-expiring first; _id breaks ties so pages never overlap
+PRODUCT_SORT = [("expiry", 1), ("_id", 1)]
+
+FILTER_OPTIONS = ["All Items", "Expiring This Week", "Expired Only"]
+
+# Bulk entry reads the first two export columns, so an exported file can be imported back
+BULK_COLUMNS = EXPORT_COLUMNS[:2]
+
+# Pasted lines split on the last of these, so product names may contain commas
+PASTE_SEPARATORS = ("\t", ";", ",")
+
+
+def build_product_query(user_email: str, filter_option: str = "All Items", search_term: str = "",
+                        now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Translate the Products tab filters into a MongoDB query
+
+    Args:
+        user_email (str): Owner of the products
+        filter_option (str): One of FILTER_OPTIONS
+        search_term (str): Case-insensitive substring of the product name
+        now (datetime): Reference time, defaults to datetime.now()
+
+    Only products whose expiry is a BSON date are matched: strings and nulls
+    sort before dates in Mongo's cross-type order, which would break the
+    keyset pagination in fetch_product_page. build_undated_query finds the rest.
+
+    Returns:
+        dict: Query for collection.find
+    """
+    now = now or datetime.now()
+    query = {"user_email": user_email, "is_deleted": {"$ne": True}, "expiry": {"$type": "date"}}
+
+    # Same boundaries as classify_expiry's floor-divided days_left
+    if filter_option == "Expiring This Week":
+        query["expiry"].update({"$gte": now, "$lt": now + timedelta(days=8)})
+    elif filter_option == "Expired Only":
+        query["expiry"]["$lt"] = now
+
+    _add_name_search(query, search_term)
+    return query
+
+
+def build_undated_query(user_email: str, search_term: str = "") -> Dict[str, Any]:
+    """Query for the live products whose expiry is missing or not a date (e.g. older string imports)"""
+    query = {"user_email": user_email, "is_deleted": {"$ne": True}, "expiry": {"$not": {"$type": "date"}}}
+    _add_name_search(query, search_term)
+    return query
+
+
+def _add_name_search(query: Dict[str, Any], search_term: str):
+    # An unanchored, case-insensitive regex cannot use an index (a collation
+    # index on name only serves exact or prefix matches), so the search filters
+    # the owner's products already narrowed by user_active_expiry.
+    if search_term:
+        query["name"] = {"$regex": re.escape(search_term), "$options": "i"}
+
+
+def fetch_product_page(collection, query: Dict[str, Any], page_size: int,
+                       after: Optional[Tuple[datetime, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple]]:
+    """
+    Fetch one page of products using keyset pagination on (expiry, _id)
+
+    Args:
+        collection: products collection
+        query (dict): Filter from build_product_query
+        page_size (int): Products per page
+        after (tuple): (expiry, _id) of the last product on the previous page
+
+    Returns:
+        tuple: (products on this page, cursor for the next page or None)
+    """
+    if after is not None:
+        expiry, last_id = after
+        query = {"$and": [query, {"$or": [
+            {"expiry": {"$gt": expiry}},
+            {"expiry": expiry, "_id": {"$gt": last_id}}
+        ]}]}
+
+    # One extra document tells us whether another page exists
+    page = list(collection.find(query).sort(PRODUCT_SORT).limit(page_size + 1))
+    if len(page) <= page_size:
+        return page, None
+    page = page[:page_size]
+    return page, (page[-1]["expiry"], page[-1]["_id"])
+
+
+def annotate_expiry(products: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Copy products with expiry_dt, days_left and status added, dropping unparseable dates"""
+    summary = classify_expiry(products, now)
+    return [
+        dict(p, expiry_dt=expiry, days_left=int(days), status=status)
+        for p, expiry, days, status in zip(products,
+                                           summary["expiry"].astype(object),
+                                           summary["days_left"],
+                                           summary["status"])
+        if status != "Unknown"
+    ]
+
+
+def parse_pasted_products(text: str):
+    """
+    Turn a pasted list into bulk-entry rows
+
+    Each non-empty line is a product name and an expiry date separated by a
+    tab, semicolon or comma. A pasted CSV export (with its header) also works.
+
+    Returns:
+        pandas.DataFrame: BULK_COLUMNS, dates still as text
+    """
+    import pandas as pd
+
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if lines:
+        # The header shows which separator the paste uses (a spreadsheet copy is tab-separated)
+        separator = next((s for s in PASTE_SEPARATORS if s in lines[0]), ",")
+        # Only an exact "Name" first field is a header, not a product such as "Nameko mushrooms"
+        if lines[0].split(separator, 1)[0].strip().lower() == BULK_COLUMNS[0].lower():
+            return read_product_import(io.StringIO("\n".join(lines)), "pasted.csv", sep=separator)
+
+    rows = []
+    for line in lines:
+        for separator in PASTE_SEPARATORS:
+            if separator in line:
+                name, _, expiry = line.rpartition(separator)
+                break
+        else:
+            name, expiry = line, ""
+        rows.append((name.strip(), expiry.strip()))
+    return pd.DataFrame(rows, columns=list(BULK_COLUMNS), dtype=object)
+
+
+def read_product_import(file, file_name: str, sep: str = ","):
+    """
+    Read a CSV or Excel file laid out like the export
+
+    Only the Name and Expiry Date columns are used; Days Left and Status are
+    recomputed from the date. sep is the CSV field separator.
+
+    Raises:
+        ValueError: If either column is missing
+    """
+    import pandas as pd
+
+    if file_name.lower().endswith(".xlsx"):
+        frame = pd.read_excel(file, engine="openpyxl", dtype=object)
+    else:
+        frame = pd.read_csv(file, sep=sep, dtype=str, keep_default_na=False, skipinitialspace=True)
+    frame.columns = [str(column).strip() for column in frame.columns]
+    missing = [column for column in BULK_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"{file_name} has no {' or '.join(missing)} column")
+    return frame[list(BULK_COLUMNS)]
+
+
+def validate_bulk_products(frame) -> Tuple[Any, List[str]]:
+    """
+    Check bulk-entry rows and parse all their expiry dates at once
+
+    ISO dates, Excel date cells and the editor's date column are converted in
+    one vectorized pandas pass; anything else (12/05/2026, 12 May 2026) goes
+    through the label date parser once per distinct string. Blank rows are
+    dropped silently.
+
+    Args:
+        frame (pandas.DataFrame): Rows with BULK_COLUMNS
+
+    Returns:
+        tuple: (DataFrame of valid rows with "name" and midnight "expiry"
+        columns, one message per rejected row)
+    """
+    import pandas as pd
+
+    names = frame[BULK_COLUMNS[0]].astype("string").str.strip().fillna("")
+    raw = frame[BULK_COLUMNS[1]].astype(object).where(frame[BULK_COLUMNS[1]].notna(), None)
+    texts = raw.map(lambda value: value.strip() if isinstance(value, str) else value)
+    blank_date = texts.isna() | (texts == "")
+
+    expiry = pd.to_datetime(texts.where(~blank_date, None), errors="coerce", format="ISO8601")
+    unparsed = expiry.isna() & ~blank_date
+    if unparsed.any():
+        distinct = {text: parse_date_string(str(text)) for text in texts[unparsed].unique()}
+        expiry[unparsed] = pd.to_datetime(texts[unparsed].map(distinct), errors="coerce")
+    expiry = expiry.dt.normalize()
+
+    blank_row = (names == "") & blank_date
+    errors = []
+    for position, (name, text, parsed, no_date, skip) in enumerate(
+            zip(names, texts, expiry, blank_date, blank_row), 1):
+        if skip:
+            continue
+        if not name:
+            errors.append(f"Row {position}: missing product name")
+        elif no_date:
+            errors.append(f"Row {position} ({name}): missing expiry date")
+        elif pd.isna(parsed):
+            errors.append(f"Row {position} ({name}): could not read expiry date {text!r}")
+
+    valid = (names != "") & expiry.notna()
+    return pd.DataFrame({"name": names[valid].astype(object), "expiry": expiry[valid]}).reset_index(drop=True), errors
+
+
+def build_product_documents(valid, user_email: str) -> List[Dict[str, Any]]:
+    """Product documents, shaped like the Add Item form's, for rows from validate_bulk_products"""
+    return [
+        {"user_email": user_email, "name": name, "expiry": expiry.to_pydatetime(), "is_deleted": False}
+        for name, expiry in zip(valid["name"], valid["expiry"])
+    ]
+
+
+def insert_products(collection, documents: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Insert many products with one insert_many
+
+    The driver sends them in as few round trips as the server's batch limits
+    allow (one for any realistic inventory).
+
+    Returns:
+        list: Inserted _ids in document order
+    """
+    if not documents:
+        return []
+    return collection.insert_many(documents, ordered=False).inserted_ids
+
+
+def set_products_deleted(collection, user_email: str, product_ids: Iterable[Any], deleted: bool = True) -> int:
+    """Move products to (or restore them from) the recycle bin with one update_many; returns how many changed"""
+    result = collection.update_many({"user_email": user_email, "_id": {"$in": list(product_ids)}},
+                                    {"$set": {"is_deleted": deleted}})
+    return result.modified_count
+
+
+def purge_products(collection, user_email: str, product_ids: Iterable[Any]) -> int:
+    """Permanently delete products with one delete_many; returns how many were removed"""
+    return collection.delete_many({"user_email": user_email, "_id": {"$in": list(product_ids)}}).deleted_count
@@ -1,30 +1,237 @@
-import schedule
-import time
+import os
+import heapq
+import itertools
 import threading
+import logging
+from datetime import datetime, timedelta, tzinfo
+from typing import Callable, Dict, Optional
+from zoneinfo import ZoneInfo
 from send_expiry_notifications import main as send_expiry_notifications
+from db import get_db
+from leader import MongoLease, default_holder_id
 
+logger = logging.getLogger(__name__)
+
+# Leadership for a job lapses if not renewed within the TTL
+LEASE_TTL_SECONDS = 180
+
+# Timezone for cron expressions; defaults to the server's local time
+SCHEDULER_TIMEZONE = os.environ.get("SCHEDULER_TIMEZONE")
+
+# One scheduler per process, however many Streamlit sessions start it
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_holder_id = default_holder_id()
+
+
+class CronSchedule:
+    """
+    Standard 5-field cron expression: minute hour day-of-month month day-of-week
+
+    Fields accept *, numbers, ranges (1-5), lists (1,15) and steps (*/10, 9-17/2).
+    Day-of-week is 0-6 with 0 (or 7) for Sunday. As in cron, when both day
+    fields are restricted a day matches if either does.
+    """
+
+    _FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str, tz: Optional[tzinfo] = None):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.tz = tz or datetime.now().astimezone().tzinfo
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(part, low, high) for part, (low, high) in zip(parts, self._FIELDS)
+        )
+        self.weekdays = {d % 7 for d in weekdays}
+        self.days_restricted = parts[2] != "*"
+        self.weekdays_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(","):
+            spec, _, step = part.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(v) for v in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+                if step:
+                    end = high
+            if not (low <= start <= end <= high):
+                raise ValueError(f"Cron field {field!r} out of range {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        dom = day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return dom or dow
+        return dom and dow
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after`, as an aware datetime"""
+        start = after.astimezone(self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = datetime(day.year, day.month, day.day, hour, minute, tzinfo=self.tz)
+                        if candidate >= start:
+                            return candidate
+            day = datetime(day.year, day.month, day.day, tzinfo=self.tz) + timedelta(days=1)
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+
+class Scheduler:
+    """
+    Event-driven job scheduler
+
+    Next run times sit in a heap; the scheduler thread sleeps on a Condition
+    until the earliest one is due (or a job is added, triggered or the
+    scheduler is shut down), so it uses no CPU while idle and fires on time.
+    With a lease factory, each run first takes a per-job lease so only one
+    replica in a deployment executes it.
+    """
+
+    def __init__(self, lease_factory: Optional[Callable[[str], MongoLease]] = None):
+        self._lease_factory = lease_factory
+        self._leases: Dict[str, MongoLease] = {}
+        self._jobs: Dict[str, tuple] = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def add_job(self, name: str, func: Callable, cron: str, tz: Optional[tzinfo] = None):
+        """Register func to run on a cron schedule; replaces an existing job of the same name"""
+        schedule = CronSchedule(cron, tz)
+        with self._condition:
+            self._jobs[name] = (func, schedule)
+            # Drop the previous schedule's pending run when a job is replaced
+            self._heap = [entry for entry in self._heap if entry[2] != name or entry[3]]
+            heapq.heapify(self._heap)
+            self._push(name, schedule.next_after(datetime.now(schedule.tz)), forced=False)
+
+    def run_now(self, name: str):
+        """Trigger a registered job immediately, on this replica, without waiting for its schedule"""
+        with self._condition:
+            if name not in self._jobs:
+                raise KeyError(f"Unknown job: {name}")
+            self._push(name, datetime.now().astimezone(), forced=True)
+
+    def next_run(self, name: str) -> Optional[datetime]:
+        with self._condition:
+            times = [when for when, _, job, forced in self._heap if job == name and not forced]
+            return min(times) if times else None
+
+    def start(self) -> threading.Thread:
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name="expiry-scheduler", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def shutdown(self, wait: bool = True):
+        """Stop the scheduler thread; a job already running is allowed to finish"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _push(self, name: str, when: datetime, forced: bool):
+        heapq.heappush(self._heap, (when, next(self._counter), name, forced))
+        self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = (self._heap[0][0] - datetime.now().astimezone()).total_seconds()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(timeout=delay)
+                if self._stopped:
+                    return
+                when, _, name, forced = heapq.heappop(self._heap)
+                if name not in self._jobs:
+                    continue
+                func, schedule = self._jobs[name]
+                if not forced:
+                    self._push(name, schedule.next_after(when), forced=False)
+            self._execute(name, func, forced)
+
+    def _execute(self, name: str, func: Callable, forced: bool):
+        lease = None
+        if self._lease_factory is not None and not forced:
+            if name not in self._leases:
+                self._leases[name] = self._lease_factory(name)
+            lease = self._leases[name]
+            if not lease.acquire():
+                logger.info(f"Skipping {name}: another replica holds the lease")
+                return
+
+        stop = threading.Event()
+        if lease is not None:
+            # Keep renewing so a long run is not taken over mid-way
+            def heartbeat():
+                while not stop.wait(lease.ttl.total_seconds() / 3):
+                    lease.acquire()
+            threading.Thread(target=heartbeat, daemon=True).start()
+
+        try:
+            logger.info(f"Running scheduled job {name}")
+            func()
+        except Exception as e:
+            logger.error(f"Scheduled job {name} failed: {e}")
+        finally:
+            stop.set()
+
+
+def _job_lease(name: str) -> MongoLease:
+    return MongoLease(get_db()["leases"], f"job:{name}", LEASE_TTL_SECONDS, holder=_holder_id)
+
+
+def get_scheduler() -> Scheduler:
+    """The process-wide scheduler with the app's jobs registered"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            tz = ZoneInfo(SCHEDULER_TIMEZONE) if SCHEDULER_TIMEZONE else None
+            _scheduler = Scheduler(lease_factory=_job_lease)
+            # Check for expiring products daily at 9 AM
+            _scheduler.add_job("expiry-notifications", send_expiry_notifications, "0 9 * * *", tz)
+        return _scheduler
 
-def run_scheduler():
-    """Run the scheduler in a separate thread"""
-    # Schedule to run daily at 9 AM
-    schedule.every().day.at("09:00").do(send_expiry_notifications)
-    
-    print("Scheduler started. Will check for expiring products daily at 9 AM.")
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
 
 def start_scheduler():
-    """Start scheduler in background thread"""
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    return scheduler_thread
+    """Start the process-wide scheduler thread if it is not already running"""
+    scheduler = get_scheduler()
+    thread = scheduler.start()
+    print(f"Scheduler running as {_holder_id}. Next expiry check: {scheduler.next_run('expiry-notifications')}")
+    return thread
+
 
 if __name__ == "__main__":
-    # For testing - run immediately
+    # For testing - run immediately, then keep the schedule
     print("Running expiry check...")
-    send_expiry_notifications()
-    
-    # Then start scheduler
-    run_scheduler()
\ No newline at end of file
+    scheduler = get_scheduler()
+    scheduler.run_now("expiry-notifications")
+    thread = scheduler.start()
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        scheduler.shutdown()
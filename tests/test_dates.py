@@ -0,0 +1,50 @@
+"""
+Date candidates keep every reading of an ambiguous label date
+"""
+from datetime import datetime
+
+from dates import find_date_candidates
+from ocr_cache import OCRCache
+from ocr_result import OCRResult
+
+MAY_4 = datetime(2026, 5, 4)
+APRIL_5 = datetime(2026, 4, 5)
+
+
+def test_ambiguous_date_keeps_the_other_reading():
+    candidate, = find_date_candidates("EXP 04/05/2026")
+
+    assert candidate.date == MAY_4
+    assert candidate.alternatives == (APRIL_5,)
+    assert candidate.ambiguous
+
+
+def test_month_first_swaps_the_preferred_reading():
+    candidate, = find_date_candidates("EXP 04/05/2026", day_first=False)
+
+    assert (candidate.date, candidate.alternatives) == (APRIL_5, (MAY_4,))
+
+
+def test_unambiguous_dates_have_no_alternatives():
+    assert [c.alternatives for c in find_date_candidates("EXP 25/05/2026\nBEST BEFORE 12 Mar 2027")] == [(), ()]
+
+
+def test_alternatives_survive_the_disk_cache(tmp_path):
+    path = str(tmp_path / "ocr_cache.sqlite")
+    result = OCRResult(find_date_candidates("EXP 04/05/2026"), product_name="MILK")
+    OCRCache(disk_path=path).set("label", "EXP 04/05/2026", result.to_dict())
+
+    # A fresh cache reads the JSON back from disk
+    restored = OCRResult.from_dict(OCRCache(disk_path=path).get("label")["parsed"])
+
+    assert restored == result
+    assert restored.alternative_dates == (APRIL_5,)
+
+
+def test_results_cached_before_alternatives_still_load():
+    old_entry = {"candidates": [[MAY_4, "04/05/2026", 4, 14, "kw_numeric", 0.95]], "lines": [[0, 14]]}
+
+    restored = OCRResult.from_dict(old_entry)
+
+    assert restored.expiry_date == MAY_4
+    assert restored.alternative_dates == ()
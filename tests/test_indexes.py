@@ -0,0 +1,123 @@
+"""
+Index bootstrap and query-plan checks
+
+mongomock has no query planner, so PlannedDatabase reports an IXSCAN only
+when an index's leading key is filtered on. Set MONGO_TEST_URI to also run
+the plan check against a real server.
+"""
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from pymongo import MongoClient  # noqa: E402
+from pymongo.errors import DuplicateKeyError, OperationFailure  # noqa: E402
+
+import indexes  # noqa: E402
+from alerts import due_alerts_pipeline  # noqa: E402
+
+
+class PlannedCursor:
+    def __init__(self, collection, query):
+        self.collection = collection
+        self.query = query
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def explain(self):
+        leading_keys = {info["key"][0][0] for info in self.collection.index_information().values()}
+        stage = "IXSCAN" if leading_keys & set(self.query) else "COLLSCAN"
+        plan = {"stage": stage} if stage == "COLLSCAN" else {"stage": "FETCH", "inputStage": {"stage": stage}}
+        return {"queryPlanner": {"winningPlan": plan}}
+
+
+class PlannedCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def find(self, query):
+        return PlannedCursor(self.collection, query)
+
+
+class PlannedDatabase:
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        return PlannedCollection(self.db[name])
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().grocery_db
+
+
+def test_query_plans_fail_without_indexes(db):
+    with pytest.raises(indexes.CollectionScanError) as error:
+        indexes.check_query_plans(PlannedDatabase(db))
+
+    for label, *_ in indexes.app_queries():
+        assert label in str(error.value)
+
+
+def test_query_plans_pass_once_indexes_are_ensured(db):
+    indexes.ensure_indexes(db)
+
+    plans = indexes.check_query_plans(PlannedDatabase(db))
+
+    assert all("IXSCAN" in stages for stages in plans.values())
+
+
+def test_due_notifications_check_uses_the_alert_job_filter():
+    now = datetime(2027, 5, 12, 9, 30)
+    queries = {label: query for label, _, query, _ in indexes.app_queries(now)}
+
+    assert queries["due notifications"] == due_alerts_pipeline(now, "notifications")[0]["$match"]
+
+
+def test_index_that_cannot_be_built_does_not_hold_back_the_others(db):
+    db["products"].insert_many([{"user_email": "shopper@example.com", "ocr_source": "label.jpg"} for _ in range(2)])
+
+    with pytest.raises(OperationFailure):
+        indexes.ensure_indexes(db)
+
+    assert "user_ocr_source_unique" not in db["products"].index_information()
+    assert "product_threshold_expiry_unique" in db["notifications"].index_information()
+    assert "email_unique" in db["users"].index_information()
+
+
+@pytest.mark.skipif(not os.getenv("MONGO_TEST_URI"), reason="MONGO_TEST_URI is not set")
+def test_query_plans_against_a_real_server():
+    client = MongoClient(os.environ["MONGO_TEST_URI"])
+    name = f"plan_check_{uuid.uuid4().hex[:8]}"
+    try:
+        # An empty or missing collection is planned as EOF rather than COLLSCAN
+        for collection_name in indexes.INDEXES:
+            client[name][collection_name].insert_one({})
+        with pytest.raises(indexes.CollectionScanError):
+            indexes.check_query_plans(client[name])
+        indexes.ensure_indexes(client[name])
+        assert indexes.check_query_plans(client[name])
+    finally:
+        client.drop_database(name)
+        client.close()
+
+
+def test_ledger_index_keys_on_expiry_and_replaces_the_old_one(db):
+    ledger = db["notifications"]
+    ledger.create_index([("product_id", 1), ("threshold", 1)], name="product_threshold_unique", unique=True)
+    indexes.ensure_indexes(db)
+    assert "product_threshold_unique" not in ledger.index_information()
+
+    ledger.insert_one({"product_id": "milk", "threshold": 3, "expiry": datetime(2027, 5, 12)})
+    # Postponed: the same threshold for the new date is a new reminder
+    ledger.insert_one({"product_id": "milk", "threshold": 3, "expiry": datetime(2027, 5, 20)})
+    with pytest.raises(DuplicateKeyError):
+        ledger.insert_one({"product_id": "milk", "threshold": 3, "expiry": datetime(2027, 5, 12)})
@@ -0,0 +1,86 @@
+"""
+Leader election: several lease holders (one per replica) sharing one mongomock collection
+"""
+import os
+import threading
+import time
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+os.environ.setdefault("EMAIL_ADDRESS", "alerts@example.com")
+os.environ.setdefault("EMAIL_PASSWORD", "app-password")
+
+from leader import MongoLease  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+
+REPLICAS = 5
+
+
+@pytest.fixture
+def leases():
+    return mongomock.MongoClient().grocery_db["leases"]
+
+
+def run_together(targets):
+    """Start every target at the same moment and wait for all of them"""
+    barrier = threading.Barrier(len(targets))
+    results = [None] * len(targets)
+
+    def run(index, target):
+        barrier.wait()
+        results[index] = target()
+
+    threads = [threading.Thread(target=run, args=(i, t)) for i, t in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_exactly_one_holder_wins_the_lease(leases):
+    holders = [MongoLease(leases, "job:expiry-notifications", holder=f"replica-{i}") for i in range(REPLICAS)]
+
+    won = run_together([holder.acquire for holder in holders])
+
+    assert won.count(True) == 1
+    leader = holders[won.index(True)]
+    assert leader.is_leader
+    assert leases.find_one({"_id": "job:expiry-notifications"})["holder"] == leader.holder
+    # Renewing keeps it; the others still cannot take it
+    assert leader.acquire()
+    assert not any(holder.acquire() for holder in holders if holder is not leader)
+
+
+def test_standby_takes_over_after_the_ttl(leases):
+    leader = MongoLease(leases, "job:expiry-notifications", ttl_seconds=0.3, holder="replica-a")
+    standby = MongoLease(leases, "job:expiry-notifications", ttl_seconds=0.3, holder="replica-b")
+
+    assert leader.acquire()
+    assert not standby.acquire()
+
+    # The leader dies without releasing; its lease lapses after the TTL
+    time.sleep(0.4)
+    assert not leader.is_leader
+    assert standby.acquire()
+    assert not leader.acquire()
+
+
+def test_only_one_scheduler_replica_runs_the_job(leases):
+    runs = []
+    lock = threading.Lock()
+
+    def job():
+        with lock:
+            runs.append(threading.current_thread().name)
+        time.sleep(0.2)  # still running while the other replicas try
+
+    schedulers = [Scheduler(lease_factory=lambda name, i=i: MongoLease(leases, f"job:{name}", 60,
+                                                                       holder=f"replica-{i}"))
+                  for i in range(REPLICAS)]
+
+    run_together([lambda s=s: s._execute("expiry-notifications", job, forced=False) for s in schedulers])
+
+    assert len(runs) == 1
@@ -0,0 +1,145 @@
+"""
+ProductStore against mongomock in polling mode, with change events applied by hand
+"""
+import time
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from live_updates import ProductStore  # noqa: E402
+
+ALICE = "alice@example.com"
+BOB = "bob@example.com"
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().grocery_db["products"]
+    collection.insert_many([
+        {"_id": 1, "user_email": ALICE, "name": "Milk", "is_deleted": False},
+        {"_id": 2, "user_email": ALICE, "name": "Bread", "is_deleted": True},
+        {"_id": 3, "user_email": BOB, "name": "Eggs", "is_deleted": False},
+    ])
+    return collection
+
+
+@pytest.fixture
+def store(collection):
+    return ProductStore(collection, mode="poll", poll_seconds=0.05)
+
+
+def names(products):
+    return sorted(p["name"] for p in products)
+
+
+def test_first_read_loads_active_and_deleted_products(store):
+    assert names(store.products(ALICE)) == ["Milk"]
+    assert names(store.products(ALICE, deleted=True)) == ["Bread"]
+    assert store.version(ALICE) == 0
+
+
+def test_insert_and_update_events_reach_only_their_owner(store):
+    store.products(ALICE), store.products(BOB)
+
+    store._apply({"operationType": "insert",
+                  "fullDocument": {"_id": 4, "user_email": ALICE, "name": "Cheese", "is_deleted": False}})
+    store._apply({"operationType": "update",
+                  "fullDocument": {"_id": 1, "user_email": ALICE, "name": "Oat milk", "is_deleted": False}})
+
+    assert names(store.products(ALICE)) == ["Cheese", "Oat milk"]
+    assert store.version(ALICE) == 2
+    assert store.version(BOB) == 0
+
+
+def test_update_for_an_uncached_user_or_a_vanished_document_is_ignored(store):
+    store.products(ALICE)
+
+    store._apply({"operationType": "insert",
+                  "fullDocument": {"_id": 5, "user_email": "carol@example.com", "name": "Jam"}})
+    store._apply({"operationType": "update", "fullDocument": None})
+
+    assert store.version(ALICE) == 0
+
+
+def test_delete_and_drop_events(store):
+    store.products(ALICE), store.products(BOB)
+
+    store._apply({"operationType": "delete", "documentKey": {"_id": 3}})
+    assert store.products(BOB) == []
+    assert store.version(ALICE) == 0
+
+    store._apply({"operationType": "drop"})
+    assert store.products(ALICE) == [] and store.products(ALICE, deleted=True) == []
+    assert store.version(ALICE) == 1
+
+
+def test_derived_values_are_recomputed_after_a_change(store):
+    calls = []
+
+    def count(products):
+        calls.append(1)
+        return len(products)
+
+    assert store.derived(ALICE, "count", count) == 1
+    assert store.derived(ALICE, "count", count) == 1
+    store._apply({"operationType": "insert",
+                  "fullDocument": {"_id": 4, "user_email": ALICE, "name": "Cheese", "is_deleted": False}})
+
+    assert store.derived(ALICE, "count", count) == 2
+    assert len(calls) == 2
+
+
+def test_refresh_products_applies_local_writes_before_their_events(collection, store):
+    store.products(ALICE)
+    collection.update_one({"_id": 1}, {"$set": {"is_deleted": True}})
+    collection.insert_one({"_id": 4, "user_email": ALICE, "name": "Cheese", "is_deleted": False})
+    collection.delete_one({"_id": 2})
+    # Moved to another owner: gone from this user's cache
+    collection.update_one({"_id": 4}, {"$set": {"user_email": BOB}})
+
+    store.refresh_products(ALICE, [1, 2, 4])
+
+    assert store.products(ALICE) == []
+    assert names(store.products(ALICE, deleted=True)) == ["Milk"]
+
+
+def test_poll_bumps_only_users_whose_products_changed(collection, store):
+    store.products(ALICE), store.products(BOB)
+
+    store._poll()
+    assert (store.version(ALICE), store.version(BOB)) == (0, 0)
+
+    collection.insert_one({"_id": 4, "user_email": BOB, "name": "Butter", "is_deleted": False})
+    store._poll()
+
+    assert (store.version(ALICE), store.version(BOB)) == (0, 1)
+    assert names(store.products(BOB)) == ["Butter", "Eggs"]
+
+
+def test_background_thread_polls_in_poll_mode(collection, store):
+    store.products(ALICE)
+    store.start()
+    try:
+        collection.insert_one({"_id": 4, "user_email": ALICE, "name": "Cheese", "is_deleted": False})
+        deadline = time.monotonic() + 5
+        while store.version(ALICE) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        store.stop()
+
+    assert names(store.products(ALICE)) == ["Cheese", "Milk"]
+
+
+def test_least_recently_read_user_is_evicted(collection):
+    store = ProductStore(collection, mode="poll", max_users=2)
+    store.products(ALICE)
+    store.products(BOB)
+    store.products(ALICE)  # Bob is now the least recently read
+
+    store.products("carol@example.com")
+
+    assert list(store._users) == [ALICE, "carol@example.com"]
+    # An evicted user is reloaded from Mongo on the next read
+    collection.insert_one({"_id": 4, "user_email": BOB, "name": "Butter", "is_deleted": False})
+    assert names(store.products(BOB)) == ["Butter", "Eggs"]
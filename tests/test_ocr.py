@@ -0,0 +1,81 @@
+"""
+The shared label flow (cache, engines, parser) behind every OCR entry point
+"""
+import pytest
+
+pytest.importorskip("streamlit")
+
+import ocr_backfill  # noqa: E402
+from ocr import MAX_IMAGE_BYTES, AzureDocumentIntelligenceOCR, ImageTooLargeError  # noqa: E402
+from ocr_async import AsyncDocumentIntelligenceOCR  # noqa: E402
+from ocr_cache import OCRCache  # noqa: E402
+from ocr_engines import OCREngine, OCRRouter, OCRText  # noqa: E402
+
+
+class LabelEngine(OCREngine):
+    """Local engine that reads the same label off every image and counts the reads"""
+
+    name = "label"
+
+    def __init__(self, text="FRESH MILK 1L\nEXP 12/05/2027\n"):
+        self.text = text
+        self.reads = 0
+
+    def analyze(self, image_bytes, image=None):
+        self.reads += 1
+        return OCRText(self.text, 0.99, self.name)
+
+
+@pytest.fixture
+def engine():
+    return LabelEngine()
+
+
+@pytest.fixture
+def service(engine):
+    return AzureDocumentIntelligenceOCR(cache=OCRCache(max_entries=16), engine=OCRRouter(engine, None))
+
+
+def test_extract_from_bytes_reads_once_then_serves_the_cache(engine, service):
+    first = service.extract_from_bytes(b"label")
+    second = service.extract_from_bytes(b"label")
+
+    assert first.expiry_date.strftime("%Y-%m-%d") == "2027-05-12"
+    assert second == first
+    assert engine.reads == 1
+
+
+def test_label_without_text_has_no_result(service):
+    service.engine.local.text = "  \n"
+
+    assert service.extract_from_bytes(b"blank") is None
+
+
+def test_batch_shares_the_cache_with_single_reads(engine, service):
+    service.extract_from_bytes(b"one")
+
+    results = service.extract_expiry_dates_batch([b"one", b"two", b"two"])
+
+    assert [r.product_name for r in results] == ["FRESH MILK 1L"] * 3
+    assert engine.reads == 2
+
+
+def test_oversized_images_are_rejected_by_every_entry_point(engine, service, tmp_path):
+    too_large = b"\0" * (MAX_IMAGE_BYTES + 1)
+    photo = tmp_path / "huge.jpg"
+    photo.write_bytes(too_large)
+
+    with pytest.raises(ImageTooLargeError):
+        service.extract_from_bytes(too_large)
+    with pytest.raises(ImageTooLargeError):
+        ocr_backfill.read_label(service, ocr_backfill.LabelImage(photo, None, "store@example.com"))
+    assert service.extract_expiry_dates_batch([too_large, b"small"])[0] is None
+
+    async_service = AsyncDocumentIntelligenceOCR(parser=service, endpoint="", key="", timeout=5)
+    try:
+        with pytest.raises(ImageTooLargeError):
+            async_service.submit(too_large).result(timeout=5)
+        assert async_service.submit(b"small").result(timeout=5).product_name == "FRESH MILK 1L"
+    finally:
+        async_service.close()
+    assert engine.reads == 1
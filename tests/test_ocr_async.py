@@ -0,0 +1,167 @@
+"""
+AsyncDocumentIntelligenceOCR against a local fake of the Document Intelligence REST API
+
+The fake answers the analyze POST with 202 and an Operation-Location, then
+reports "running" on each poll until the test lets the operation finish, so
+the real async client (and its aiohttp transport) does the whole round trip.
+"""
+import json
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# aiohttp is deliberately not skipped: the async client cannot run without it
+pytest.importorskip("azure.ai.documentintelligence.aio")
+
+from ocr import AzureDocumentIntelligenceOCR  # noqa: E402
+from ocr_async import AsyncDocumentIntelligenceOCR  # noqa: E402
+from ocr_cache import OCRCache  # noqa: E402
+from ocr_engines import build_router  # noqa: E402
+
+LABEL_LINES = ["FRESH MILK 1L", "EXP 12/05/2027"]
+
+
+def analyze_result(lines):
+    words = [word for line in lines for word in line.split()]
+    return {
+        "apiVersion": "2024-11-30",
+        "modelId": "prebuilt-read",
+        "content": "\n".join(lines),
+        "pages": [{
+            "pageNumber": 1,
+            "spans": [],
+            "lines": [{"content": line, "polygon": [], "spans": []} for line in lines],
+            "words": [{"content": word, "confidence": 0.99, "polygon": [], "span": {"offset": 0, "length": 1}}
+                      for word in words],
+        }],
+    }
+
+
+class FakeDocumentIntelligence:
+    """Threaded HTTP server speaking just enough of the analyze LRO protocol"""
+
+    def __init__(self):
+        self.finished = threading.Event()
+        self.posts = 0
+        self.polls = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None, headers=()):
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if ":analyze" not in self.path:
+                    return self._send(404, {"error": {"code": "NotFound", "message": self.path}})
+                with fake.lock:
+                    fake.posts += 1
+                location = f"{fake.endpoint}/documentintelligence/documentModels/prebuilt-read/analyzeResults/1" \
+                           f"?api-version=2024-11-30"
+                self._send(202, headers=[("Operation-Location", location)])
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.polls += 1
+                if not fake.finished.is_set():
+                    return self._send(200, {"status": "running"})
+                self._send(200, {"status": "succeeded", "createdDateTime": "2025-01-01T00:00:00Z",
+                                 "lastUpdatedDateTime": "2025-01-01T00:00:01Z",
+                                 "analyzeResult": analyze_result(LABEL_LINES)})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.finished.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_azure():
+    with FakeDocumentIntelligence() as fake:
+        yield fake
+
+
+@pytest.fixture
+def service(fake_azure):
+    parser = AzureDocumentIntelligenceOCR(
+        cache=OCRCache(max_entries=16),
+        engine=build_router(fake_azure.endpoint, "fake-key", lambda: None, engine="azure"),
+    )
+    service = AsyncDocumentIntelligenceOCR(parser=parser, endpoint=fake_azure.endpoint, key="fake-key",
+                                           polling_interval=0.05, timeout=10)
+    yield service
+    service.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def test_submit_returns_immediately_and_resolves_with_the_parsed_label(fake_azure, service):
+    future = service.submit(b"label-photo")
+    wait_for(lambda: fake_azure.polls >= 1)
+    assert not future.done()
+
+    fake_azure.finished.set()
+    result = future.result(timeout=5)
+
+    assert result.expiry_date.strftime("%Y-%m-%d") == "2027-05-12"
+    assert result.product_name == "FRESH MILK 1L"
+    assert fake_azure.posts == 1
+
+
+def test_repeat_submission_is_served_from_the_cache(fake_azure, service):
+    fake_azure.finished.set()
+    first = service.submit(b"same-photo").result(timeout=5)
+    second = service.submit(b"same-photo").result(timeout=5)
+
+    assert second == first
+    assert fake_azure.posts == 1
+
+
+def test_timeout_fails_the_future(fake_azure, service):
+    future = service.submit(b"slow-label", timeout=0.3)
+
+    with pytest.raises((TimeoutError, FutureTimeoutError)):
+        future.result(timeout=5)
+    assert fake_azure.posts == 1
+
+
+def test_cancel_stops_polling(fake_azure, service):
+    future = service.submit(b"abandoned-label")
+    wait_for(lambda: fake_azure.polls >= 2)
+
+    assert future.cancel()
+    # Let any poll already on the wire land, then make sure no new ones follow
+    time.sleep(0.2)
+    polls_after_cancel = fake_azure.polls
+    time.sleep(0.3)
+
+    assert future.cancelled()
+    assert fake_azure.polls == polls_after_cancel
@@ -0,0 +1,217 @@
+"""
+AzureThrottle with fake request functions standing in for Azure
+"""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ocr_throttle import AzureThrottle, RetryBudget, TokenBucket
+
+
+class AzureError(Exception):
+    """Shaped like azure.core's HttpResponseError: a status_code and a response with headers"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def throttled(retry_after_ms=10):
+    return AzureError(429, {"retry-after-ms": str(retry_after_ms)})
+
+
+def flaky(errors, result="ok"):
+    """A request function raising each of errors in turn, then returning result"""
+    calls = []
+
+    def request():
+        calls.append(time.monotonic())
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    request.calls = calls
+    return request
+
+
+def unlimited(**kwargs):
+    # tps=0 disables the bucket so only the behaviour under test adds delay
+    return AzureThrottle(**{"tps": 0, "burst": 1, "max_concurrency": 8, "max_retries": 4, **kwargs})
+
+
+# ---- TokenBucket ----
+def test_bucket_allows_a_burst_then_spaces_requests_at_the_rate():
+    bucket = TokenBucket(rate=10, capacity=3)
+
+    waits = [bucket.reserve() for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.1, abs=0.01)
+    assert waits[4] == pytest.approx(0.2, abs=0.01)
+
+
+def test_bucket_pause_holds_back_the_next_reservation():
+    bucket = TokenBucket(rate=10, capacity=3)
+
+    bucket.pause(1.0)
+
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+
+
+def test_bucket_with_no_rate_never_waits():
+    bucket = TokenBucket(rate=0, capacity=1)
+    bucket.pause(5)
+
+    assert [bucket.reserve() for _ in range(100)] == [0.0] * 100
+
+
+# ---- RetryBudget ----
+def test_retry_budget_is_a_reserve_topped_up_by_requests():
+    budget = RetryBudget(ratio=0.5, reserve=2)
+
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def test_retry_budget_never_grows_past_its_reserve():
+    budget = RetryBudget(ratio=1, reserve=2)
+    for _ in range(10):
+        budget.deposit()
+
+    assert [budget.withdraw() for _ in range(3)] == [True, True, False]
+
+
+# ---- AzureThrottle.call ----
+def test_throttled_attempts_are_retried_after_retry_after():
+    throttle = unlimited()
+    request = flaky([throttled(50), AzureError(503, {"Retry-After": "0.05"})])
+
+    assert throttle.call(request) == "ok"
+
+    assert len(request.calls) == 3
+    assert request.calls[1] - request.calls[0] >= 0.05
+    assert request.calls[2] - request.calls[1] >= 0.05
+    assert throttle.snapshot() == {"requests": 1, "throttled": 2, "retries": 2, "gave_up": 0}
+
+
+def test_other_errors_are_raised_without_retrying():
+    throttle = unlimited()
+    request = flaky([AzureError(400)])
+
+    with pytest.raises(AzureError):
+        throttle.call(request)
+
+    assert len(request.calls) == 1
+    assert throttle.snapshot()["retries"] == 0
+
+
+def test_gives_up_after_max_retries():
+    throttle = unlimited(max_retries=2)
+    request = flaky([throttled()] * 5)
+
+    with pytest.raises(AzureError):
+        throttle.call(request)
+
+    assert len(request.calls) == 3
+    assert throttle.snapshot()["gave_up"] == 1
+
+
+def test_an_empty_retry_budget_stops_retries():
+    throttle = unlimited()
+    throttle.budget = RetryBudget(ratio=0, reserve=1)
+
+    with pytest.raises(AzureError):
+        throttle.call(flaky([throttled()] * 5))
+    # The one retry in the reserve is spent; the next throttled request is not retried
+    request = flaky([throttled()])
+    with pytest.raises(AzureError):
+        throttle.call(request)
+
+    assert len(request.calls) == 1
+    assert throttle.snapshot()["retries"] == 1
+
+
+def test_a_throttled_response_pauses_the_bucket_for_every_caller():
+    throttle = AzureThrottle(tps=100, burst=10, max_concurrency=8, max_retries=1)
+    request = flaky([throttled(300)])
+    caller = threading.Thread(target=throttle.call, args=(request,))
+    caller.start()
+    while not request.calls:
+        time.sleep(0.005)
+    time.sleep(0.02)
+
+    # Another caller, arriving while the first waits to retry, is held back too
+    assert throttle.bucket.reserve() > 0.1
+    caller.join(timeout=5)
+    assert len(request.calls) == 2
+
+
+def test_concurrency_is_capped_across_threads():
+    throttle = unlimited(max_concurrency=2)
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.pop()
+
+    threads = [threading.Thread(target=throttle.call, args=(request,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert max(peak) == 2
+
+
+# ---- AzureThrottle.call_async ----
+def test_async_calls_retry_throttled_attempts():
+    throttle = unlimited()
+    calls = []
+
+    async def request():
+        calls.append(1)
+        if len(calls) == 1:
+            raise throttled()
+        return "ok"
+
+    assert asyncio.run(throttle.call_async(request)) == "ok"
+    assert len(calls) == 2
+    assert throttle.snapshot()["retries"] == 1
+
+
+def test_cancelled_async_call_releases_its_slot():
+    throttle = unlimited(max_concurrency=1)
+
+    async def hang():
+        await asyncio.sleep(60)
+
+    async def ok():
+        return "ok"
+
+    async def scenario():
+        task = asyncio.create_task(throttle.call_async(hang))
+        await asyncio.sleep(0.05)
+        assert throttle._in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # With the only slot leaked this would wait forever
+        return await asyncio.wait_for(throttle.call_async(ok), timeout=2)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert throttle._in_flight == 0
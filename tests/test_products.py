@@ -0,0 +1,63 @@
+"""
+Bulk-entry parsing of pasted product lists
+"""
+import pytest
+
+pytest.importorskip("pandas")
+
+from products import BULK_COLUMNS, parse_pasted_products  # noqa: E402
+
+
+@pytest.mark.parametrize("separator", ["\t", ";", ","])
+def test_pasted_export_with_header_uses_its_separator(separator):
+    text = separator.join(["Name", "Expiry Date", "Days Left", "Status"]) + "\n" + \
+        separator.join(["Milk", "2027-05-12", "3", "Expiring Soon"]) + "\n" + \
+        separator.join(["Cheddar", "2027-06-01", "23", "Fresh"])
+
+    rows = parse_pasted_products(text)
+
+    assert list(rows.columns) == list(BULK_COLUMNS)
+    assert rows.values.tolist() == [["Milk", "2027-05-12"], ["Cheddar", "2027-06-01"]]
+
+
+def test_pasted_lines_without_header_split_on_the_last_separator():
+    rows = parse_pasted_products("Milk, semi-skimmed, 2027-05-12\nCheddar\t02/06/2027\nBread")
+
+    assert rows.values.tolist() == [["Milk, semi-skimmed", "2027-05-12"], ["Cheddar", "02/06/2027"],
+                                    ["Bread", ""]]
+
+
+def test_product_whose_name_starts_with_name_is_not_a_header():
+    rows = parse_pasted_products("Nameko mushrooms, 2026-05-01\nMilk, 2026-05-12")
+
+    assert rows.values.tolist() == [["Nameko mushrooms", "2026-05-01"], ["Milk", "2026-05-12"]]
+
+
+def test_pasted_header_without_expiry_column_is_a_value_error():
+    with pytest.raises(ValueError, match="Expiry Date"):
+        parse_pasted_products("Name\tBest Before\nMilk\t2027-05-12")
+
+
+def test_paging_reaches_every_dated_product_past_string_and_null_expiries():
+    mongomock = pytest.importorskip("mongomock")
+    from datetime import datetime
+    from products import build_product_query, build_undated_query, fetch_product_page
+
+    collection = mongomock.MongoClient().db.products
+    owner = "shopper@example.com"
+    dated = [f"dated {day}" for day in range(1, 8)]
+    collection.insert_many(
+        [{"user_email": owner, "name": name, "expiry": datetime(2027, 5, day), "is_deleted": False}
+         for day, name in enumerate(dated, 1)] +
+        [{"user_email": owner, "name": "string expiry", "expiry": "2027-05-03", "is_deleted": False},
+         {"user_email": owner, "name": "no expiry", "expiry": None, "is_deleted": False}])
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = fetch_product_page(collection, build_product_query(owner), 2, cursor)
+        seen += [p["name"] for p in page]
+        if cursor is None:
+            break
+
+    assert seen == dated
+    assert sorted(p["name"] for p in collection.find(build_undated_query(owner))) == ["no expiry", "string expiry"]
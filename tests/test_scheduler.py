@@ -0,0 +1,88 @@
+"""
+CronSchedule parsing and next run times, in UTC so the results do not depend on the host
+"""
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+os.environ.setdefault("EMAIL_ADDRESS", "alerts@example.com")
+os.environ.setdefault("EMAIL_PASSWORD", "app-password")
+
+from scheduler import CronSchedule  # noqa: E402
+
+# A Wednesday
+WEDNESDAY = datetime(2027, 5, 12, 8, 0, tzinfo=timezone.utc)
+
+
+def runs(expression, after=WEDNESDAY, count=4):
+    """The next count run times as "MM-DD HH:MM" strings"""
+    schedule = CronSchedule(expression, timezone.utc)
+    times = []
+    for _ in range(count):
+        after = schedule.next_after(after)
+        times.append(after.strftime("%m-%d %H:%M"))
+    return times
+
+
+def test_lists_ranges_and_steps():
+    schedule = CronSchedule("*/15 9-17/4 1,15 * 1-5", timezone.utc)
+
+    assert schedule.minutes == {0, 15, 30, 45}
+    assert schedule.hours == {9, 13, 17}
+    assert schedule.days == {1, 15}
+    assert schedule.weekdays == {1, 2, 3, 4, 5}
+
+
+def test_a_number_with_a_step_runs_to_the_end_of_the_field():
+    assert CronSchedule("10/20 * * * *", timezone.utc).minutes == {10, 30, 50}
+
+
+def test_next_run_is_strictly_after_the_given_time():
+    assert runs("0 8 * * *", count=2) == ["05-13 08:00", "05-14 08:00"]
+    assert runs("*/30 9 * * *", count=3) == ["05-12 09:00", "05-12 09:30", "05-13 09:00"]
+
+
+def test_day_of_week_alone_restricts_to_those_days():
+    assert runs("0 9 * * 1", count=2) == ["05-17 09:00", "05-24 09:00"]
+
+
+def test_both_day_fields_match_a_day_if_either_does():
+    # The 13th (a Thursday) by day of month, then every Friday by day of week
+    assert runs("0 9 13 * 5") == ["05-13 09:00", "05-14 09:00", "05-21 09:00", "05-28 09:00"]
+
+
+def test_sunday_can_be_written_as_0_or_7():
+    assert CronSchedule("0 9 * * 7", timezone.utc).weekdays == {0}
+    assert runs("0 9 * * 7", count=2) == runs("0 9 * * 0", count=2) == ["05-16 09:00", "05-23 09:00"]
+
+
+def test_month_field_skips_to_the_next_matching_month():
+    schedule = CronSchedule("0 0 1 2 *", timezone.utc)
+
+    assert schedule.next_after(WEDNESDAY) == datetime(2028, 2, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("expression", [
+    "60 * * * *",
+    "* 24 * * *",
+    "* * 0 * *",
+    "* * 32 * *",
+    "* * * 13 *",
+    "* * * * 8",
+    "* 17-9 * * *",
+])
+def test_out_of_range_fields_are_rejected(expression):
+    with pytest.raises(ValueError, match="out of range"):
+        CronSchedule(expression, timezone.utc)
+
+
+@pytest.mark.parametrize("expression", ["0 9 * *", "0 9 * * * *", ""])
+def test_expression_needs_five_fields(expression):
+    with pytest.raises(ValueError, match="5 fields"):
+        CronSchedule(expression, timezone.utc)
+
+
+def test_expression_that_never_fires_is_an_error():
+    with pytest.raises(ValueError, match="never fires"):
+        CronSchedule("0 0 30 2 *", timezone.utc).next_after(WEDNESDAY)
@@ -0,0 +1,145 @@
+"""
+Digest delivery against a local aiosmtpd stand-in for the SMTP relay
+"""
+import os
+import smtplib
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+
+os.environ.setdefault("EMAIL_ADDRESS", "alerts@example.com")
+os.environ.setdefault("EMAIL_PASSWORD", "app-password")
+
+import send_expiry_notifications as notifications  # noqa: E402
+
+REFUSED = "nobody@example.com"
+
+
+class Relay:
+    """Accepts mail for everyone but REFUSED and checks logins against one password"""
+
+    def __init__(self, password="app-password"):
+        self.password = password
+        self.logins = 0
+        self.delivered = []
+        self.lock = threading.Lock()
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        with self.lock:
+            self.logins += 1
+        if auth_data.password.decode() == self.password:
+            return AuthResult(success=True)
+        # handled defaults to True, which leaves the client waiting for a reply
+        return AuthResult(success=False, handled=False, message="535 5.7.8 Authentication credentials invalid")
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REFUSED:
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted for delivery"
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def relay():
+    handler = Relay()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port(),
+                            authenticator=handler.authenticate, auth_require_tls=False,
+                            # smtplib falls back to LOGIN with an initial response, which aiosmtpd does not answer
+                            auth_exclude_mechanism=["LOGIN"])
+    controller.start()
+    handler.port = controller.port
+    yield handler
+    controller.stop()
+
+
+def session_factory(relay, password="app-password"):
+    return lambda: notifications.SMTPSession("127.0.0.1", relay.port, "alerts@example.com", password,
+                                             use_tls=False)
+
+
+def digests(recipients):
+    return [(f"Digest for {to}", "🚨 GROCERY EXPIRY ALERT 🚨", to, []) for to in recipients]
+
+
+def test_each_worker_logs_in_once_for_all_its_digests(relay):
+    recipients = [f"user{i}@example.com" for i in range(20)]
+
+    sent, attempted = notifications.send_digests(digests(recipients), workers=2,
+                                                 session_factory=session_factory(relay))
+
+    assert (sent, attempted) == (20, 20)
+    assert sorted(relay.delivered) == sorted(recipients)
+    assert relay.logins <= 2
+
+
+def test_rejected_login_stops_the_run(relay):
+    recipients = [f"user{i}@example.com" for i in range(50)]
+
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        notifications.send_digests(digests(recipients), workers=4,
+                                   session_factory=session_factory(relay, password="wrong"))
+
+    # At most one failed login per worker, not one (or three) per recipient
+    assert 1 <= relay.logins <= 4
+    assert relay.delivered == []
+
+
+def test_refused_recipient_fails_only_its_digest(relay):
+    recipients = ["a@example.com", REFUSED, "b@example.com", "c@example.com"]
+    sent_to = []
+
+    sent, attempted = notifications.send_digests(
+        digests(recipients), workers=1, session_factory=session_factory(relay),
+        on_sent=lambda digest: sent_to.append(digest[2]))
+
+    assert (sent, attempted) == (3, 4)
+    assert sent_to == ["a@example.com", "b@example.com", "c@example.com"]
+    # The refusal did not cost a reconnect and a second login
+    assert relay.logins == 1
+
+
+def test_dropped_connection_reconnects(relay):
+    session = session_factory(relay)()
+    first, second = digests(["a@example.com", "b@example.com"])
+
+    assert notifications.send_email(*first[:3], session=session)
+    session.server.close()  # the relay hung up between messages
+    assert notifications.send_email(*second[:3], session=session)
+    session.close()
+
+    assert relay.delivered == ["a@example.com", "b@example.com"]
+    assert relay.logins == 2
+
+
+def test_failed_setup_does_not_leave_a_half_open_connection(relay):
+    # The relay offers no STARTTLS, so the connection fails after it is opened
+    session = notifications.SMTPSession("127.0.0.1", relay.port, "alerts@example.com", "app-password",
+                                        use_tls=True)
+    digest, = digests(["a@example.com"])
+
+    assert not notifications.send_email(*digest[:3], session=session)
+    assert session.server is None
+
+    # The next digest on the same session starts from a fresh connection
+    session.use_tls = False
+    assert notifications.send_email(*digest[:3], session=session)
+    session.close()
+    assert relay.delivered == ["a@example.com"]
@@ -0,0 +1,76 @@
+import numpy as np
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+from dates import parse_stored_date
+
+# Items expiring within this many days are flagged as "Expiring Soon"
+EXPIRING_SOON_DAYS = 3
+
+EXPIRY_STATUSES = ("Expired", "Expiring Soon", "Fresh")
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def _coerce_expiry(value):
+    """Turn a product dict or stored expiry value into something numpy can hold"""
+    if isinstance(value, dict):
+        value = value.get("expiry")
+    return parse_stored_date(value)
+
+
+def _to_datetime64(items) -> np.ndarray:
+    """Convert products, datetimes or a datetime64 column into a datetime64[s] array"""
+    if hasattr(items, "to_numpy"):  # pandas Series / Index
+        items = items.to_numpy()
+    if isinstance(items, np.ndarray) and items.dtype.kind == "M":
+        return items.astype("datetime64[s]")
+    return np.array([_coerce_expiry(item) for item in items], dtype="datetime64[s]")
+
+
+def classify_expiry(items, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Classify a whole batch of expiry dates in one vectorized pass
+
+    Args:
+        items: Product dicts with an "expiry" field, datetimes/strings, or a
+            pandas/NumPy datetime64 column
+        now: Reference time, defaults to datetime.now()
+
+    Returns:
+        dict: "expiry" (datetime64[s]), "days_left" (int64) and "status" arrays
+        aligned with items, plus "counts" per status. Missing or unparseable
+        dates get the status "Unknown" and are left out of the counts.
+    """
+    expiries = _to_datetime64(items)
+    reference = np.datetime64(now or datetime.now(), "s")
+
+    valid = ~np.isnat(expiries)
+    seconds_left = np.where(valid, expiries - reference, np.timedelta64(0, "s")).astype(np.int64)
+    # Floor division matches timedelta.days, so "today, earlier" counts as -1
+    days_left = np.floor_divide(seconds_left, SECONDS_PER_DAY)
+
+    status = np.select(
+        [~valid, days_left < 0, days_left <= EXPIRING_SOON_DAYS],
+        ["Unknown", "Expired", "Expiring Soon"],
+        default="Fresh"
+    ).astype(object)
+
+    counts = {name: int(np.count_nonzero(status == name)) for name in EXPIRY_STATUSES}
+
+    return {
+        "expiry": expiries,
+        "days_left": days_left,
+        "status": status,
+        "counts": counts
+    }
+
+
+def calendar_days_left(expiries: np.ndarray, today: Optional[date] = None) -> np.ndarray:
+    """Whole calendar days from today to each datetime64 expiry (0 where the date is missing)"""
+    days = expiries.astype("datetime64[D]") - np.datetime64(today or date.today(), "D")
+    return np.where(np.isnat(days), 0, days.astype(np.int64))
+
+
+def get_expiry_status(expiry, now: Optional[datetime] = None) -> str:
+    """Classify a single expiry date as Expired, Expiring Soon or Fresh"""
+    return classify_expiry([expiry], now)["status"][0]